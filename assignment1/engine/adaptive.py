@@ -0,0 +1,89 @@
+import numpy as np
+from .fem1d import FEM1D
+from .lagrangetruss import TrussLagrange
+
+def estimateError(model, fEnd: float = 0.0):
+    """Jump based a posteriori error indicators of a truss solved with
+       u(0) = 0 and a point load fEnd at x = L. Each interior vertex
+       contributes the square of its stress jump to its two neighbouring
+       elements and the free end contributes the mismatch between the
+       stress and fEnd / A, all weighted by element length.
+
+       The stress is E times getStrainField at both ends of every element.
+
+    Args:
+        model (Truss): Solved truss model.
+        fEnd (float, optional): Point load at x = L. Defaults to 0.0.
+
+    Returns:
+        tuple: (eta, estimate), the (nElem,) element indicators and the
+            global estimate relative to the L2 norm of the stress.
+    """
+    sigma = model.E * model.getStrainField(2).reshape((model.nElem, 2))
+    jumps = sigma[1:, 0] - sigma[:-1, 1]
+    eta2 = np.zeros(model.nElem)
+    eta2[:-1] += jumps**2 / 2
+    eta2[1:] += jumps**2 / 2
+    eta2[-1] += (sigma[-1, 1] - fEnd / model.A)**2
+    eta2 *= model.lElems
+    norm2 = np.sum(model.lElems * (sigma**2).mean(axis=1))
+    eta = np.sqrt(eta2)
+    estimate = np.sqrt(eta2.sum() / norm2) if norm2 > 0 else 0.0
+    return eta, estimate
+
+def refine(vertices: np.ndarray, flagged: np.ndarray):
+    """Bisects the flagged elements of a vertex array.
+
+    Args:
+        vertices (np.ndarray): (nElem + 1,) element boundary coordinates.
+        flagged (np.ndarray): (nElem,) boolean mask of elements to split.
+
+    Returns:
+        np.ndarray: Refined vertex array.
+    """
+    midpoints = (vertices[:-1] + vertices[1:])[flagged] / 2
+    return np.sort(np.concatenate((vertices, midpoints)))
+
+def solveAdaptive(E: float, L: float, A: float, qStart: float, qEnd: float, fStart: float, fEnd: float,
+                  order: int = 1, tol: float = 1e-2, nElem: int = 1, theta: float = 0.5,
+                  maxIter: int = 30, maxElem: int = 100_000, storage: str = 'dense'):
+    """Solves the u(0) = 0, du/dx(L) = 0 truss on a coarse mesh and bisects
+       the elements whose indicator is at least theta times the largest one
+       until the relative estimate falls below tol.
+
+    Args:
+        E (float): Young's modulus.
+        L (float): Length of the Truss.
+        A (float): Cross-section area.
+        qStart (float): Distributed load at x = 0.
+        qEnd (float): Distributed load at x = L.
+        fStart (float): Point load at x = 0.
+        fEnd (float): Point load at x = L.
+        order (int, optional): Element order. Defaults to 1.
+        tol (float, optional): Target relative error estimate. Defaults to 1e-2.
+        nElem (int, optional): Elements of the initial uniform mesh. Defaults to 1.
+        theta (float, optional): Marking fraction of the largest indicator. Defaults to 0.5.
+        maxIter (int, optional): Refinement step limit. Defaults to 30.
+        maxElem (int, optional): Element count limit. Defaults to 100000.
+        storage (str, optional): Global stiffness storage. Defaults to 'dense'.
+
+    Returns:
+        tuple: (model, history), the final solved TrussLagrange and a list of
+            (nElem, nNode, estimate) per step.
+    """
+    vertices = np.linspace(0, L, nElem + 1)
+    history = []
+    for _ in range(maxIter + 1):
+        x_node = FEM1D.nodesFromVertices(vertices, order + 1)
+        model = TrussLagrange(E, L, A, vertices.size - 1, order, storage, x_node)
+        model.formKGlobal()
+        model.formFGlobal(qStart, qEnd, fStart, fEnd)
+        model.formDirichletNeumann()
+        model.solve()
+
+        eta, estimate = estimateError(model, fEnd)
+        history.append((model.nElem, model.nNode, estimate))
+        if estimate <= tol or model.nElem >= maxElem:
+            break
+        vertices = refine(vertices, eta >= theta * eta.max())
+    return model, history
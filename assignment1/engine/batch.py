@@ -0,0 +1,135 @@
+import numpy as np
+from .taperedtruss import TaperedTrussLinear, TaperedTrussQuadratic
+
+class TrussBatch:
+    def __init__(self, cls, L: float, nElem: int, E, A, h1 = 1.0, h2 = None) -> None:
+        """Stacks B independent trusses of the same element type and mesh
+           into 3D arrays that are assembled and solved in single calls.
+
+           Element stiffness is linear in E*A and affine in the taper ratio
+           (h2 - h1) / h1, so the element matrices of cls are evaluated only
+           twice and every model is a weighted sum of the two.
+
+        Args:
+            cls (type): TrussLinear, TrussQuadratic or one of the tapered classes.
+            L (float): Length shared by every model.
+            nElem (int): Number of elements shared by every model.
+            E (array_like): (B,) Young's moduli.
+            A (array_like): (B,) areas, A0 for the tapered classes.
+            h1 (array_like, optional): (B,) heights at x = 0. Defaults to 1.0.
+            h2 (array_like, optional): (B,) heights at x = L. Defaults to h1.
+        """
+        h2 = h1 if h2 is None else h2
+        self.E, self.A, self.h1, self.h2 = np.broadcast_arrays(*map(np.atleast_1d, (E, A, h1, h2)))
+        self.B = self.E.size
+        self.cls = cls
+        self.model = self._prototype(cls, L, nElem, 0.0)
+        self.nNode = self.model.nNode
+        self.x_node = self.model.x_node
+        self.conn = self.model.conn
+        self.KGlobal = None
+        self.FGlobal = None
+        self.D_k = None
+        self.solution = None
+
+        K0 = self.model.formKGlobal()
+        K1 = self._prototype(cls, L, nElem, 1.0).formKGlobal() - K0
+        self._KUnit = (K0, K1)
+        self._FUnit = np.hstack([self.model.formFGlobal(*load) for load in np.eye(4)])
+
+    @staticmethod
+    def _prototype(cls, L, nElem, ratio):
+        if issubclass(cls, (TaperedTrussLinear, TaperedTrussQuadratic)):
+            return cls(1.0, L, 1.0, 1.0, 1.0 + ratio, nElem)
+        return cls(1.0, L, 1.0, nElem)
+
+    def formKGlobal(self):
+        K0, K1 = self._KUnit
+        EA = (self.E * self.A)[:, None, None]
+        ratio = ((self.h2 - self.h1) / self.h1)[:, None, None]
+        self.KGlobal = EA * (K0 + ratio * K1)
+        return self.KGlobal
+
+    def formFGlobal(self, qStart, qEnd, fStart, fEnd):
+        loads = np.stack(np.broadcast_arrays(qStart, qEnd, fStart, fEnd, self.E)[:4], axis=-1)
+        self.FGlobal = (loads @ self._FUnit.T)[:, :, None]
+        return self.FGlobal
+
+    def formDirichlet(self, u0, uL):
+        D_k = np.stack(np.broadcast_arrays(u0, uL, self.E)[:2], axis=-1)
+        self.model.formDirichlet(0.0, 0.0)
+        self.D_k = D_k[:, :, None].astype(float)
+
+    def formDirichletNeumann(self):
+        self.model.formDirichletNeumann()
+        self.D_k = np.zeros((self.B, 1, 1))
+
+    def solve(self, solver: str = 'dense'):
+        """Solves every model at once.
+
+        Args:
+            solver (str, optional): 'dense' for one batched np.linalg.solve or
+                'banded' for batched band elimination. Defaults to 'dense'.
+
+        Returns:
+            np.ndarray: (B, nNode, 1) nodal displacements.
+        """
+        idx_u = self.model.system.idx_u
+        idx_k = self.model.system.idx_k
+        K_uu = self.KGlobal[:, idx_u[:, None], idx_u]
+        K_uk = self.KGlobal[:, idx_u[:, None], idx_k]
+        rhs = self.FGlobal[:, idx_u] - K_uk @ self.D_k
+        if solver == 'dense':
+            D_u = np.linalg.solve(K_uu, rhs)
+        elif solver == 'banded':
+            b = self.model.nLocalNode - 1
+            D_u = solveBandedBatch(K_uu, rhs, b)
+        else:
+            raise ValueError(f'Unknown solver {solver!r}.')
+        self.solution = np.empty((self.B, self.nNode, 1))
+        self.solution[:, idx_u] = D_u
+        self.solution[:, idx_k] = self.D_k
+        return self.solution
+
+    def getXField(self, n: int = 20):
+        return self.model.getXField(n)
+
+    def getDispField(self, n: int = 20):
+        N, _ = self.model.fieldTables(n)
+        return (self.solution[:, self.conn, 0] @ N.T).reshape((self.B, -1, 1))
+
+    def getStrainField(self, n: int = 20):
+        _, dN = self.model.fieldTables(n)
+        return (self.solution[:, self.conn, 0] @ dN.T * (2 / self.model.lElem)).reshape((self.B, -1, 1))
+
+def solveBandedBatch(K: np.ndarray, F: np.ndarray, b: int):
+    """Solves a stack of symmetric positive definite band systems by
+       Gaussian elimination without pivoting, vectorized over the stack.
+
+    Args:
+        K (np.ndarray): (B, n, n) matrices with half bandwidth b.
+        F (np.ndarray): (B, n, nRHS) right-hand sides.
+        b (int): Half bandwidth.
+
+    Returns:
+        np.ndarray: (B, n, nRHS) solutions.
+    """
+    n = K.shape[1]
+    # Row band layout, band[:, i, b + j - i] = K[:, i, j]
+    band = np.zeros((K.shape[0], n, 2 * b + 1))
+    for d in range(-b, b + 1):
+        i = np.arange(max(0, -d), min(n, n - d))
+        band[:, i, b + d] = K[:, i, i + d]
+    x = np.array(F, dtype=float)
+
+    for k in range(n):
+        last = min(n, k + b + 1)
+        for i in range(k + 1, last):
+            f = band[:, i, b + k - i] / band[:, k, b]
+            band[:, i, b + k - i:b + last - i] -= f[:, None] * band[:, k, b:b + last - k]
+            x[:, i] -= f[:, None] * x[:, k]
+    for k in range(n - 1, -1, -1):
+        last = min(n, k + b + 1)
+        x[:, k] -= np.einsum('bj,bjr->br', band[:, k, b + 1:b + last - k], x[:, k + 1:last])
+        x[:, k] /= band[:, k, b][:, None]
+    return x
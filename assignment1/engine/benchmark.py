@@ -0,0 +1,222 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+from .truss import TrussLinear, TrussQuadratic
+from .taperedtruss import TaperedTrussLinear, TaperedTrussQuadratic
+
+STAGES = ('formKGlobal', 'formFGlobal', 'form', 'solve', 'getXField', 'getDispField', 'getStrainField')
+
+MODELS = {
+    'TrussLinear': lambda nElem, storage, precision = 'double':
+        TrussLinear(50e3, 1000, 75e3, nElem, storage, precision = precision),
+    'TrussQuadratic': lambda nElem, storage, precision = 'double':
+        TrussQuadratic(50e3, 1000, 75e3, nElem, storage, precision = precision),
+    'TaperedTrussLinear': lambda nElem, storage, precision = 'double':
+        TaperedTrussLinear(50e3, 1000, 300, 30, 10, nElem, storage, precision = precision),
+    'TaperedTrussQuadratic': lambda nElem, storage, precision = 'double':
+        TaperedTrussQuadratic(50e3, 1000, 300, 30, 10, nElem, storage, precision = precision),
+}
+
+def measure(func, repeat: int = 1):
+    """Times func and traces its peak memory in a separate call.
+
+    Args:
+        func (callable): Stage to measure.
+        repeat (int, optional): Timed calls, the best one is kept. Defaults to 1.
+
+    Returns:
+        tuple: (wall time [s], peak traced memory [bytes]).
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def benchmarkModel(name: str, nElem: int, storage: str = 'dense', repeat: int = 1, n: int = 20):
+    """Measures every stage of one model in the order of the homework drivers.
+
+    Returns:
+        dict: Stage name to {'time': seconds, 'peak': bytes}.
+    """
+    model = MODELS[name](nElem, storage)
+    # Unchanged inputs hit the KGlobal and partition caches, so every call
+    # first invalidates them to pay for the assembly and the partition
+    stages = {
+        'formKGlobal': lambda: (model.markStiffnessDirty(), model.formKGlobal()),
+        'formFGlobal': lambda: model.formFGlobal(200, 200, 0, 100e3),
+        'form': lambda: (setattr(model.system, 'pattern', None), model.formDirichletNeumann()),
+        # Drop the cached factorization so every call pays for it
+        'solve': lambda: (setattr(model.system, 'factorization', None), model.solve()),
+        'getXField': lambda: model.getXField(n),
+        'getDispField': lambda: model.getDispField(n),
+        'getStrainField': lambda: model.getStrainField(n),
+    }
+    result = {}
+    for stage in STAGES:
+        t, peak = measure(stages[stage], repeat)
+        result[stage] = {'time': t, 'peak': peak}
+    return result
+
+def scalingExponent(sizes, values):
+    """Least squares slope of log(values) against log(sizes)."""
+    sizes = np.asarray(sizes, dtype=float)
+    values = np.asarray(values, dtype=float)
+    valid = values > 0
+    if valid.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[valid]), np.log(values[valid]), 1)[0])
+
+def runBenchmarks(models = tuple(MODELS), sizes = None, storage: str = 'dense', repeat: int = 3, n: int = 20):
+    """Runs every stage of every model over the given element counts.
+
+    Args:
+        models (tuple, optional): Model names from MODELS. Defaults to all.
+        sizes (optional): Element counts. Defaults to 10 log-spaced values in [10, 1e4].
+        storage (str, optional): Storage backend. Defaults to 'dense'.
+        repeat (int, optional): Timed calls per stage. Defaults to 3.
+        n (int, optional): Field points per element. Defaults to 20.
+
+    Returns:
+        dict: JSON serializable report with per-size measurements and the
+            fitted time and memory scaling exponents of every stage.
+    """
+    if sizes is None:
+        sizes = np.unique(np.geomspace(10, 1e4, 10).astype(int))
+    sizes = [int(s) for s in sizes]
+    report = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'storage': storage,
+        'repeat': repeat,
+        'n': n,
+        'sizes': sizes,
+        'models': {},
+    }
+    for name in models:
+        runs = [benchmarkModel(name, nElem, storage, repeat, n) for nElem in sizes]
+        report['models'][name] = {
+            stage: {
+                'time': [run[stage]['time'] for run in runs],
+                'peak': [run[stage]['peak'] for run in runs],
+                'timeExponent': scalingExponent(sizes, [run[stage]['time'] for run in runs]),
+                'peakExponent': scalingExponent(sizes, [run[stage]['peak'] for run in runs]),
+            } for stage in STAGES
+        }
+    return report
+
+def _nbytes(K):
+    # Sparse matrices keep their values and index arrays separately
+    if hasattr(K, 'nbytes'):
+        return K.nbytes
+    return K.data.nbytes + K.indices.nbytes + K.indptr.nbytes
+
+def comparePrecision(name: str, nElem: int, storage: str = 'banded'):
+    """Solves one model in float64 and in mixed precision and compares the
+       two solutions.
+
+    Returns:
+        dict: 'double' and 'mixed' solve times [s] and KGlobal sizes [bytes],
+            'error' the max norm of the mixed minus the float64 displacements
+            relative to the float64 max norm, 'iterations' the refinement
+            steps and 'fallback' whether the mixed solve fell back to float64.
+    """
+    result = {}
+    solutions = {}
+    for precision in ('double', 'mixed'):
+        model = MODELS[name](nElem, storage, precision)
+        model.formKGlobal()
+        model.formFGlobal(200, 200, 0, 100e3)
+        model.formDirichletNeumann()
+        nbytes = _nbytes(model.system.KGlobal)
+        start = time.perf_counter()
+        solutions[precision] = model.solve()
+        result[precision] = {'time': time.perf_counter() - start, 'bytes': nbytes}
+    result['error'] = float(np.abs(solutions['mixed'] - solutions['double']).max()
+                            / np.abs(solutions['double']).max())
+    result['iterations'] = model.system.iterations
+    result['fallback'] = model.system.refineFallback
+    return result
+
+def compareReports(old: dict, new: dict, threshold: float = 1.25):
+    """Lists stages whose time grew by more than threshold between two reports
+       at the sizes both reports share.
+
+    Returns:
+        list: (model, stage, nElem, ratio) tuples of the regressions.
+    """
+    regressions = []
+    for name, stages in new['models'].items():
+        if name not in old['models']:
+            continue
+        for stage, data in stages.items():
+            oldData = old['models'][name].get(stage)
+            if oldData is None:
+                continue
+            oldTimes = dict(zip(old['sizes'], oldData['time']))
+            for size, t in zip(new['sizes'], data['time']):
+                if size in oldTimes and oldTimes[size] > 0 and t / oldTimes[size] > threshold:
+                    regressions.append((name, stage, size, t / oldTimes[size]))
+    return regressions
+
+def printReport(report: dict):
+    for name, stages in report['models'].items():
+        print(name)
+        print(f'  {"stage":<16}' + ''.join(f'{s:>11}' for s in report['sizes']) + f'{"exp":>7}')
+        for stage, data in stages.items():
+            exponent = data['timeExponent']
+            print(f'  {stage:<16}' + ''.join(f'{t:>11.2e}' for t in data['time'])
+                  + (f'{exponent:>7.2f}' if exponent is not None else f'{"-":>7}'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the FEM1D hot paths.')
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--min', type=int, default=10, help='Smallest number of elements.')
+    parser.add_argument('--max', type=int, default=10_000, help='Largest number of elements.')
+    parser.add_argument('--steps', type=int, default=7, help='Number of log-spaced sizes.')
+    parser.add_argument('--storage', default='banded', help="Storage backend, 'dense', 'banded' or 'sparse'.")
+    parser.add_argument('--max-bytes', type=float, default=1e9,
+                        help='Skip sizes whose dense KGlobal and K_uu together exceed this.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark.json', help='JSON report path.')
+    parser.add_argument('--compare', default=None, help='Previous JSON report to check for regressions.')
+    parser.add_argument('--precision', action='store_true',
+                        help='Compare float64 and mixed precision solves instead of timing the stages.')
+    args = parser.parse_args()
+
+    sizes = np.unique(np.geomspace(args.min, args.max, args.steps).astype(int))
+    if args.storage == 'dense':
+        # Quadratic models have the most nodes, 2 nElem + 1, each dense block is nNode^2 doubles
+        fits = 2 * 8.0 * (2 * sizes + 1)**2 <= args.max_bytes
+        for nElem in sizes[~fits]:
+            print(f'nElem={nElem} skipped, dense KGlobal and K_uu exceed --max-bytes')
+        sizes = sizes[fits]
+    if args.precision:
+        print(f'{"model":<22}{"nElem":>9}{"double [s]":>12}{"mixed [s]":>11}{"K ratio":>9}'
+              f'{"rel error":>11}{"iter":>6}{"fallback":>10}')
+        for name in args.models:
+            for nElem in sizes:
+                r = comparePrecision(name, int(nElem), args.storage)
+                print(f'{name:<22}{nElem:>9}{r["double"]["time"]:>12.2e}{r["mixed"]["time"]:>11.2e}'
+                      f'{r["mixed"]["bytes"] / r["double"]["bytes"]:>9.2f}{r["error"]:>11.2e}'
+                      f'{r["iterations"]:>6}{str(r["fallback"]):>10}')
+        raise SystemExit
+    report = runBenchmarks(args.models, sizes, args.storage, args.repeat)
+    printReport(report)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for name, stage, size, ratio in compareReports(old, report):
+            print(f'REGRESSION {name}.{stage} nElem={size}: {ratio:.2f}x slower')
@@ -0,0 +1,64 @@
+import argparse
+import time
+import numpy as np
+from .fem1d import FEM1D
+from .system import System
+
+def makeSystem(nNode, storage):
+    # Tridiagonal stiffness of a linear bar, the pattern System sees in practice
+    conn = FEM1D._connect(2, nNode - 1)
+    KLocal = np.broadcast_to(np.array([[1.0, -1.0], [-1.0, 1.0]]), (nNode - 1, 2, 2))
+    system = System(nNode, storage)
+    system.KGlobal = system.storage.assemble(nNode, conn, KLocal)
+    system.FGlobal = np.ones((nNode, 1))
+    return system
+
+def timePartition(system, loop, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if loop:
+            system._formMatricesLoop()
+        else:
+            system._formMatrices()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark(nNode, storage, loopMax, repeat):
+    system = makeSystem(nNode, storage)
+    system.form(np.zeros((2, 1)), u0Known=True, uLKnown=True)
+    tVec = timePartition(system, False, repeat)
+    blocks = (system.K_uu, system.K_uk, system.K_kk, system.F_u)
+
+    tLoop = None
+    if storage == 'dense' and nNode <= loopMax:
+        tLoop = timePartition(system, True, 1)
+        for a, b in zip(blocks, (system.K_uu, system.K_uk, system.K_kk, system.F_u)):
+            assert np.array_equal(a, b), 'Vectorized partition differs from the loop.'
+    return tVec, tLoop
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scaling benchmark of System partitioning.')
+    parser.add_argument('--min', type=int, default=10, help='Smallest number of nodes.')
+    parser.add_argument('--max', type=int, default=100_000, help='Largest number of nodes.')
+    parser.add_argument('--steps', type=int, default=9, help='Number of log-spaced sizes.')
+    parser.add_argument('--loop-max', type=int, default=2000, help='Largest size timed with the Python loop.')
+    parser.add_argument('--max-bytes', type=float, default=4e9,
+                        help='Skip sizes whose dense KGlobal and K_uu together exceed this.')
+    parser.add_argument('--storage', default='dense', help="Storage backend, 'dense', 'banded' or 'sparse'.")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = np.unique(np.geomspace(args.min, args.max, args.steps).astype(int))
+    print(f'{"nNode":>8} {"vectorized [s]":>15} {"loop [s]":>12} {"speedup":>9}')
+    for nNode in sizes:
+        # The partition copies K_uu next to KGlobal, both about nNode^2 doubles
+        if args.storage == 'dense' and 2 * 8.0 * nNode * nNode > args.max_bytes:
+            print(f'{nNode:>8} {"skipped, dense KGlobal and K_uu exceed --max-bytes":>46}')
+            continue
+        tVec, tLoop = benchmark(int(nNode), args.storage, args.loop_max, args.repeat)
+        if tLoop is None:
+            print(f'{nNode:>8} {tVec:>15.3e} {"-":>12} {"-":>9}')
+        else:
+            print(f'{nNode:>8} {tVec:>15.3e} {tLoop:>12.3e} {tLoop / tVec:>9.1f}')
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+# Bump when a change in the engine alters stored results
+CACHE_VERSION = 3
+DEFAULT_DIR = os.environ.get('FEM1D_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'fem1d'))
+
+def _canonical(value):
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value, dtype=float if value.dtype.kind in 'iuf' else None)
+        return {'array': hashlib.sha256(value.tobytes()).hexdigest(), 'dtype': value.dtype.str, 'shape': value.shape}
+    # 50000 and 50000.0 build the same model, every real number hashes as a float
+    if isinstance(value, (np.floating, float, np.integer, int)) and not isinstance(value, (bool, np.bool_)):
+        return repr(float(value))
+    if isinstance(value, (tuple, list)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    return value
+
+def cacheKey(cls, params: dict, loads: tuple, boundary = None, n: int = None):
+    """Content hash of one model configuration.
+
+    Args:
+        cls (type): Truss class.
+        params (dict): Constructor arguments of cls.
+        loads (tuple): (qStart, qEnd, fStart, fEnd) passed to formFGlobal.
+        boundary (tuple, optional): (u0, uL) for formDirichlet, None for
+            formDirichletNeumann. Defaults to None.
+        n (int, optional): Field points per element if the fields are stored.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    description = {
+        'version': CACHE_VERSION,
+        'class': f'{cls.__module__}.{cls.__qualname__}',
+        'params': _canonical(params),
+        'loads': _canonical(tuple(loads)),
+        'boundary': _canonical(boundary),
+        'n': _canonical(n),
+    }
+    text = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class ResultCache:
+    def __init__(self, path: str = DEFAULT_DIR, maxBytes: int = 1 << 30, memoryItems: int = 256) -> None:
+        """Two level store of solved results keyed by cacheKey. An in-process
+           LRU of arrays sits in front of a directory of .npz files whose
+           total size is bounded by evicting the least recently used files.
+           The directory may be shared between processes and users.
+
+        Args:
+            path (str, optional): Store directory, None keeps the memory level
+                only. Defaults to $FEM1D_CACHE_DIR or ~/.cache/fem1d.
+            maxBytes (int, optional): Disk budget. Defaults to 1 GiB.
+            memoryItems (int, optional): Entries kept in memory. Defaults to 256.
+        """
+        self.path = path
+        self.maxBytes = maxBytes
+        self.memoryItems = memoryItems
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __getstate__(self):
+        # Worker processes share the disk level and start with an empty memory level
+        state = self.__dict__.copy()
+        state['memory'] = OrderedDict()
+        return state
+
+    def _file(self, key: str):
+        return os.path.join(self.path, key + '.npz')
+
+    def get(self, key: str):
+        """Returns the stored dict of read-only arrays, or None on a miss."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.path is not None:
+            file = self._file(key)
+            try:
+                with np.load(file) as data:
+                    arrays = {name: data[name] for name in data.files}
+                # Access time is unreliable on noatime mounts, mtime orders the LRU
+                os.utime(file)
+            except (OSError, ValueError):
+                # Missing, evicted meanwhile or partially written
+                arrays = None
+            if arrays is not None:
+                self.diskHits += 1
+                return self._remember(key, arrays)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, arrays: dict):
+        """Stores a dict of arrays under key in both levels.
+
+        Returns:
+            dict: The stored read-only arrays.
+        """
+        stored = self._remember(key, arrays)
+        if self.path is not None:
+            tmp = os.path.join(self.path, f'.{key}.{os.getpid()}.tmp.npz')
+            np.savez(tmp, **arrays)
+            os.replace(tmp, self._file(key))
+            self.evict()
+        return stored
+
+    def _remember(self, key, arrays):
+        arrays = {name: np.array(value) for name, value in arrays.items()}
+        for value in arrays.values():
+            value.flags.writeable = False
+        self.memory[key] = arrays
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memoryItems:
+            self.memory.popitem(last=False)
+        return arrays
+
+    def evict(self):
+        """Deletes the least recently used files until the directory fits maxBytes."""
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith('.npz') and not entry.name.startswith('.'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.memory.clear()
+        if self.path is not None:
+            for name in os.listdir(self.path):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.path, name))
+
+def solveCached(cls, params: dict, loads: tuple, boundary = None, n: int = None, cache: ResultCache = None):
+    """Returns the solution of a model configuration from the cache, or
+       builds, solves and stores it on a miss.
+
+    Args:
+        cls (type): Truss class, e.g. TrussLinear or TaperedTrussQuadratic.
+        params (dict): Constructor arguments of cls.
+        loads (tuple): (qStart, qEnd, fStart, fEnd) passed to formFGlobal.
+        boundary (tuple, optional): (u0, uL) for formDirichlet, None for
+            formDirichletNeumann. Defaults to None.
+        n (int, optional): Also store the x, displacement and strain fields at
+            n points per element. Defaults to None.
+        cache (ResultCache, optional): Store to use. Defaults to a process wide
+            cache in DEFAULT_DIR.
+
+    Returns:
+        dict: Read-only 'solution' array and, if n is given, 'x', 'u' and 'strain'.
+    """
+    cache = defaultCache() if cache is None else cache
+    key = cacheKey(cls, params, loads, boundary, n)
+    result = cache.get(key)
+    if result is not None:
+        return result
+    model = cls(**params)
+    model.formKGlobal()
+    model.formFGlobal(*loads)
+    if boundary is None:
+        model.formDirichletNeumann()
+    else:
+        model.formDirichlet(*boundary)
+    result = {'solution': model.solve()}
+    if n is not None:
+        result['x'], result['u'], result['strain'] = model.getFields(n)
+    return cache.put(key, result)
+
+_default = None
+
+def defaultCache():
+    global _default
+    if _default is None:
+        _default = ResultCache()
+    return _default
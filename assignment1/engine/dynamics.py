@@ -0,0 +1,170 @@
+import numpy as np
+from .instrument import instrumented
+from .system import System
+
+def loadHistory(model, qStart, qEnd, fStart, fEnd):
+    """Builds F(t) for a linearly distributed load and end point loads that
+       may each vary in time. FGlobal is linear in the four load parameters,
+       so formFGlobal runs once per parameter and F(t) is a weighted sum.
+
+    Args:
+        model (Truss): Model whose formFGlobal defines the load vector.
+        qStart, qEnd, fStart, fEnd (float or callable): Constants or functions of t.
+
+    Returns:
+        callable: F(t) returning the (nNode, 1) global load vector.
+    """
+    FGlobal = model.system.FGlobal
+    FUnit = np.hstack([model.formFGlobal(*load) for load in np.eye(4)])
+    model.system.FGlobal = FGlobal
+    params = (qStart, qEnd, fStart, fEnd)
+    return lambda t: FUnit @ np.array([[p(t) if callable(p) else p] for p in params])
+
+class Newmark:
+    def __init__(self, model, dt: float, beta: float = None, gamma: float = None,
+                 alpha: float = 0.0, damping: tuple = (0.0, 0.0)) -> None:
+        """Implicit Newmark-beta time integrator with HHT-alpha numerical
+           dissipation, M a + C v + K u = F(t), for a truss whose KGlobal,
+           MGlobal and constraints are already formed.
+
+           The effective stiffness is formed and factorized once in its own
+           System, every step is one back substitution. Prescribed values
+           are held constant, their velocities and accelerations are zero.
+
+        Args:
+            model (Truss): Model after formKGlobal, formMGlobal and a boundary
+                condition method.
+            dt (float): Time step.
+            beta (float, optional): Newmark beta. Defaults to (1 - alpha)^2 / 4.
+            gamma (float, optional): Newmark gamma. Defaults to 1/2 - alpha.
+            alpha (float, optional): HHT alpha in [-1/3, 0], 0 gives the
+                undamped trapezoidal rule. Defaults to 0.0.
+            damping (tuple, optional): Rayleigh coefficients (a0, a1) of
+                C = a0 M + a1 K. Defaults to (0.0, 0.0).
+        """
+        system = model.system
+        if system.KGlobal is None or system.MGlobal is None:
+            raise ValueError('KGlobal and MGlobal must be formed first.')
+        if system.constraints is None:
+            raise ValueError('Boundary conditions are undefined.')
+        if not -1/3 <= alpha <= 0:
+            raise ValueError('HHT alpha must lie in [-1/3, 0].')
+        self.model = model
+        self.nNode = model.nNode
+        self.dt = dt
+        self.alpha = alpha
+        self.beta = (1 - alpha)**2 / 4 if beta is None else beta
+        self.gamma = 1 / 2 - alpha if gamma is None else gamma
+        self.damping = damping
+        self.storage = system.storage
+        self.K = system.KGlobal
+        self.M = system.MGlobal
+        self.springK = system._springDiagonal()
+
+        knownNodes, (springNodes, springK), mpcs = system.constraints
+        self.D_k = system.D_k
+        a0, a1 = damping
+        cM = 1 / (self.beta * dt**2) + (1 + alpha) * self.gamma * a0 / (self.beta * dt)
+        cK = (1 + alpha) * (1 + self.gamma * a1 / (self.beta * dt))
+        self.effective = System(self.nNode, self.storage.name)
+        self.effective.KGlobal = self.storage.combine(cM, self.M, cK, self.K)
+        self.effective.FGlobal = np.zeros((self.nNode, 1))
+        self.effective.formConstraints(knownNodes, self.D_k, (springNodes, cK * springK), mpcs)
+        self._constraints = (knownNodes, mpcs)
+
+    def applyK(self, u: np.ndarray):
+        return self.storage.matvec(self.K, u) + self.springK[:, None] * u
+
+    def applyC(self, v: np.ndarray):
+        a0, a1 = self.damping
+        return a0 * self.storage.matvec(self.M, v) + a1 * self.applyK(v)
+
+    def initialAcceleration(self, F: np.ndarray, u: np.ndarray, v: np.ndarray):
+        """Solves M a = F - C v - K u with zero acceleration at known nodes."""
+        knownNodes, mpcs = self._constraints
+        mass = System(self.nNode, self.storage.name)
+        mass.KGlobal = self.M
+        mass.FGlobal = np.zeros((self.nNode, 1))
+        mass.formConstraints(knownNodes, np.zeros((knownNodes.size, 1)), None,
+                             [mpc[:3] + (0.0,) for mpc in mpcs])
+        return mass.solve(F - self.applyC(v) - self.applyK(u))
+
+    @instrumented('step')
+    def step(self, u: np.ndarray, v: np.ndarray, a: np.ndarray, F: np.ndarray, FNext: np.ndarray):
+        """Advances (u, v, a) by one time step.
+
+        Args:
+            u, v, a (np.ndarray): (nNode, 1) state at t.
+            F, FNext (np.ndarray): (nNode, 1) loads at t and t + dt.
+
+        Returns:
+            tuple: (u, v, a) at t + dt.
+        """
+        dt, alpha, beta, gamma = self.dt, self.alpha, self.beta, self.gamma
+        uPred = u + dt * v + dt**2 * (1 / 2 - beta) * a
+        vPred = v + dt * (1 - gamma) * a
+        rhs = ((1 + alpha) * FNext - alpha * F
+               + alpha * (self.applyC(v) + self.applyK(u))
+               + self.storage.matvec(self.M, uPred) / (beta * dt**2))
+        if any(self.damping):
+            rhs += (1 + alpha) * self.applyC(gamma / (beta * dt) * uPred - vPred)
+        uNext = self.effective.solve(rhs)
+        aNext = (uNext - uPred) / (beta * dt**2)
+        vNext = vPred + gamma * dt * aNext
+        return uNext, vNext, aNext
+
+    def iterate(self, nSteps: int, load = None, u0: np.ndarray = None, v0: np.ndarray = None,
+                every: int = 1, n: int = 2):
+        """Streams the response one snapshot at a time, only the current
+           state is held in memory.
+
+        Args:
+            nSteps (int): Number of time steps.
+            load (callable, optional): F(t) returning the (nNode, 1) loads, see
+                loadHistory. Defaults to the constant FGlobal of the model.
+            u0 (np.ndarray, optional): Initial displacements. Defaults to the
+                prescribed values and zero elsewhere.
+            v0 (np.ndarray, optional): Initial velocities. Defaults to zero.
+            every (int, optional): Yield every that many steps. Defaults to 1.
+            n (int, optional): Stress points per element. Defaults to 2.
+
+        Yields:
+            tuple: (t, D, sigma), the time, the (nNode, 1) displacements and the
+                (nElem * n, 1) axial stress E du/dx from getStrainField(n). D is
+                also kept as the model solution.
+        """
+        if load is None:
+            FConst = self.model.system.FGlobal
+            load = lambda t: FConst
+        u = np.zeros((self.nNode, 1))
+        knownNodes, _ = self._constraints
+        u[knownNodes] = self.D_k
+        if u0 is not None:
+            u[:] = np.reshape(u0, (self.nNode, 1))
+        v = np.zeros((self.nNode, 1)) if v0 is None else np.reshape(v0, (self.nNode, 1)).astype(float)
+        F = load(0.0)
+        a = self.initialAcceleration(F, u, v)
+        for i in range(nSteps + 1):
+            if i % every == 0:
+                self.model.solution = u
+                yield i * self.dt, u, self.model.E * self.model.getStrainField(n)
+            if i < nSteps:
+                FNext = load((i + 1) * self.dt)
+                u, v, a = self.step(u, v, a, F, FNext)
+                F = FNext
+
+    def record(self, path: str, nSteps: int, load = None, u0: np.ndarray = None, v0: np.ndarray = None,
+               every: int = 1, n: int = 2):
+        """Writes the snapshots of iterate to a memory-mapped .npy file of
+           structured records with the fields 't', 'u' and 'sigma'.
+
+        Returns:
+            np.memmap: The written records, reopen with np.load(path, mmap_mode='r').
+        """
+        nField = self.model.nElem * n
+        dtype = np.dtype([('t', float), ('u', float, (self.nNode,)), ('sigma', float, (nField,))])
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(nSteps // every + 1,))
+        for i, (t, D, sigma) in enumerate(self.iterate(nSteps, load, u0, v0, every, n)):
+            out[i] = (t, D[:, 0], sigma[:, 0])
+        out.flush()
+        return out
@@ -2,7 +2,13 @@ import numpy as np
 from .system import System
 
 class FEM1D:
-    def __init__(self, L:float, nElem: int, nLocalNode:int) -> None:
+    # Attributes the assembly reads, assigning one marks KGlobal dirty
+    STIFFNESS_INPUTS = ()
+    # Geometry is derived once in __init__, a different mesh needs a new model
+    MESH = ('L', 'nElem', 'nLocalNode', 'nNode', 'lElem', 'conn', 'uniform', 'x_node', 'lElems')
+
+    def __init__(self, L:float, nElem: int, nLocalNode:int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
         """Creates a FEM 1D Element that manipulates the system object at
            the background.
 
@@ -10,20 +16,93 @@ class FEM1D:
             L (float): Length of the Truss Element.
             nElem (int): Number of Elements.
             nLocalNode (int): Number of local nodes inside an element.
+            storage (str, optional): Global stiffness storage, 'dense', 'banded'
+                or 'sparse'. Defaults to 'dense'.
+            x_node (np.ndarray, optional): Increasing coordinates of all nNode nodes
+                from 0 to L for non-uniform meshes, equally spaced within every
+                element as from nodesFromVertices. Defaults to equally spaced nodes.
+            precision (str, optional): 'double', or 'mixed' to store and factor K in
+                float32 and refine the solution in float64. Defaults to 'double'.
         """        
+        self.stiffnessDirty = True
         self.nElem = nElem
         self.nLocalNode = nLocalNode
         self.nNode = (nElem - 1) * (nLocalNode - 1) + nLocalNode
         self.L = L
         self.lElem = self.L / self.nElem
         self.conn = self._connect(nLocalNode, nElem)
-        self.x_node = np.linspace(0, self.L, self.nNode)
-        self.system = System(self.nNode)
+        # Per element lengths, equal to lElem on the default uniform mesh
+        self.uniform = x_node is None
+        if self.uniform:
+            self.x_node = np.linspace(0, self.L, self.nNode)
+            self.lElems = np.full(self.nElem, self.lElem)
+        else:
+            self.x_node = np.asarray(x_node, dtype=float).reshape(-1)
+            if self.x_node.size != self.nNode:
+                raise ValueError(f'x_node has {self.x_node.size} nodes, expected {self.nNode}.')
+            if np.any(np.diff(self.x_node) <= 0):
+                raise ValueError('x_node must be strictly increasing.')
+            if not np.isclose(self.x_node[0], 0) or not np.isclose(self.x_node[-1], self.L):
+                raise ValueError('x_node must span [0, L].')
+            self.lElems = self.x_node[self.conn[:, -1]] - self.x_node[self.conn[:, 0]]
+            # Elements map ksi linearly, so interior nodes must be equally spaced
+            spacing = self.x_node[self.conn[:, :1]] + self.lElems[:, None] * np.linspace(0, 1, nLocalNode)
+            if not np.allclose(self.x_node[self.conn], spacing, rtol=0, atol=1e-9 * self.L):
+                raise ValueError('Interior nodes must be equally spaced within every element, '
+                                 'see nodesFromVertices.')
+        self.system = System(self.nNode, storage, precision)
         self.solution = None
+        self.reactions = None
+        self.omega = None
+        self.modes = None
     
-    def solve(self):
-        self.solution = self.system.solve()
-        return self.solution
+    def __setattr__(self, name, value):
+        if name in self.MESH and name in self.__dict__:
+            raise AttributeError(f'{name} is fixed at construction, create a new model for another mesh.')
+        if name in self.STIFFNESS_INPUTS:
+            object.__setattr__(self, 'stiffnessDirty', True)
+        object.__setattr__(self, name, value)
+
+    def markStiffnessDirty(self):
+        """Forces the next formKGlobal to reassemble, e.g. after modifying
+           localK in place.
+        """
+        self.stiffnessDirty = True
+
+    def solve(self, F: np.ndarray = None):
+        """Solves the system for FGlobal, or for every column of F at once
+           with a single factorization of the stiffness matrix.
+
+        Args:
+            F (np.ndarray, optional): (nNode, nCases) load cases. Defaults to FGlobal.
+
+        Returns:
+            np.ndarray: (nNode, nCases) nodal displacements. A single load
+                case is also kept as the solution used by the field methods
+                and its support reactions as self.reactions.
+        """
+        solution = self.system.solve(F)
+        if solution.shape[1] == 1:
+            self.solution = solution
+            self.reactions = self.system.reactions
+        return solution
+
+    def solveModes(self, k: int = 6, sigma: float = 0.0):
+        """Lowest k natural frequencies and mode shapes under the current
+           boundary conditions, see System.solveModes. Requires the mass
+           matrix, e.g. from Truss.formMGlobal.
+
+        Args:
+            k (int, optional): Number of modes. Defaults to 6.
+            sigma (float, optional): Shift in omega^2. Defaults to 0.0.
+
+        Returns:
+            tuple: (omega, modes), the (k,) angular frequencies [rad/s] and the
+                (nNode, k) mass normalized mode shapes, also kept as self.omega
+                and self.modes.
+        """
+        self.omega, self.modes = self.system.solveModes(k, sigma)
+        return self.omega, self.modes
 
     def formKGlobal(self):
         """Forms the 1D K Global Matrix
@@ -50,14 +129,45 @@ class FEM1D:
             uL (float): u(L) = uL
         """
         D_k = np.array([u0, uL]).reshape((2, 1))
-        self.system.form(D_k, u0Known=True, uLKnown=True)
+        self.system.formConstraints([0, self.nNode - 1], D_k)
 
     def formDirichletNeumann(self):
         """Applies the following boundary conditions;
             u(0) = 0, du/dx(L) = 0
         """
         D_k = np.zeros((1,1))
-        self.system.form(D_k, u0Known=True, uLKnown=False)
+        self.system.formConstraints([0], D_k)
+
+    def formConstraints(self, knownNodes, values, springs = None, mpcs = None):
+        """Applies general supports; prescribed displacements at any nodes,
+           grounded springs and multi-point constraints. Nodes that are not
+           prescribed carry the natural du/dx = 0 condition at the ends.
+
+        Args:
+            knownNodes (array_like): Global indices of the prescribed nodes.
+            values (array_like): Prescribed displacements ordered as knownNodes.
+            springs (tuple, optional): (nodes, k) arrays of grounded springs.
+            mpcs (list, optional): (slave, masters, coefficients, offset) tuples,
+                u[slave] = coefficients @ u[masters] + offset.
+        """
+        D_k = np.asarray(values, dtype=float).reshape((-1, 1))
+        self.system.formConstraints(knownNodes, D_k, springs, mpcs)
+
+    @staticmethod
+    def nodesFromVertices(vertices: np.ndarray, nLocalNode: int):
+        """Places the nodes of every element equally spaced between its vertices.
+
+        Args:
+            vertices (np.ndarray): Increasing element boundary coordinates, nElem + 1 values.
+            nLocalNode (int): Number of local nodes inside an element.
+
+        Returns:
+            np.ndarray: Coordinates of all nodes, ready for the x_node argument.
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        t = np.linspace(0, 1, nLocalNode)[:-1]
+        x = vertices[:-1, None] + np.diff(vertices)[:, None] * t
+        return np.append(x.ravel(), vertices[-1])
 
     @staticmethod
     def _connect(n: int = 2, N: int = 1):
@@ -70,9 +180,5 @@ class FEM1D:
         Returns:
             np.ndarray: Array of elements with their corresponding node indices.
         """
-        conn = np.zeros((N, n), dtype=np.int32)
-        elementIdx = np.arange(N*n)
-        for i in range(N):
-            idx = i*(n - 1)
-            conn[i] = elementIdx[idx: idx + n]
-        return conn
\ No newline at end of file
+        # Element i starts at node i * (n - 1), consecutive elements share a node
+        return (np.arange(N, dtype=np.int32)[:, None] * (n - 1) + np.arange(n, dtype=np.int32)).astype(np.int32)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import json
+import os
+import numpy as np
+
+FIELDS = ('x', 'u', 'strain', 'sigma')
+META = 'meta.json'
+
+def writeFields(model, path: str, n: int = 20, chunk: int = 65536):
+    """Streams the x, displacement, strain and stress fields of a solved
+       truss into memory-mapped .npy files, chunk by chunk of elements, so
+       only one chunk of each field is ever resident. The nodal coordinates
+       and solution are stored alongside.
+
+       The directory holds one <field>.npy per field and meta.json, which
+       is written last and marks the store complete.
+
+    Args:
+        model (Truss): Solved truss model.
+        path (str): Output directory, created if missing.
+        n (int, optional): Number of points per element. Defaults to 20.
+        chunk (int, optional): Number of elements per chunk. Defaults to 65536.
+
+    Returns:
+        str: path.
+    """
+    os.makedirs(path, exist_ok=True)
+    metaFile = os.path.join(path, META)
+    if os.path.exists(metaFile):
+        os.remove(metaFile)
+    shape = (model.nElem * n, 1)
+    out = {name: np.lib.format.open_memmap(os.path.join(path, name + '.npy'), mode='w+', dtype=float, shape=shape)
+           for name in FIELDS}
+    start = 0
+    for x, u, strain in model.iterFields(n, chunk):
+        stop = start + x.shape[0]
+        out['x'][start:stop] = x
+        out['u'][start:stop] = u
+        out['strain'][start:stop] = strain
+        np.multiply(model.E, strain, out=out['sigma'][start:stop])
+        start = stop
+    for array in out.values():
+        array.flush()
+    del out
+    np.save(os.path.join(path, 'x_node.npy'), model.x_node)
+    np.save(os.path.join(path, 'solution.npy'), model.solution)
+    meta = {'class': type(model).__name__, 'nElem': model.nElem, 'nNode': model.nNode, 'n': n, 'E': float(model.E)}
+    with open(metaFile, 'w') as f:
+        json.dump(meta, f)
+    return path
+
+class FieldStore:
+    def __init__(self, path: str) -> None:
+        """Zero-copy read-only view of a directory written by writeFields.
+           Every array is memory-mapped, pages are read on first access and
+           shared between the processes that open the same store.
+
+        Args:
+            path (str): Directory written by writeFields.
+
+        Raises:
+            FileNotFoundError: If the store is missing or was not completed.
+        """
+        with open(os.path.join(path, META)) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.nElem = self.meta['nElem']
+        self.n = self.meta['n']
+        for name in FIELDS + ('x_node', 'solution'):
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+
+    def getFields(self, elems = slice(None)):
+        """Views of the fields of a contiguous range of elements.
+
+        Args:
+            elems (slice, optional): Element range. Defaults to all.
+
+        Returns:
+            tuple: (x, u, strain, sigma) memory-mapped views of shape (n * nSelected, 1).
+        """
+        start, stop, step = elems.indices(self.nElem)
+        if step != 1:
+            raise ValueError('Only contiguous element ranges map to views.')
+        rows = slice(start * self.n, stop * self.n)
+        return tuple(getattr(self, name)[rows] for name in FIELDS)
+
+    def iterFields(self, chunk: int = 65536):
+        """Yields the (x, u, strain, sigma) views chunk by chunk of elements."""
+        for start in range(0, self.nElem, chunk):
+            yield self.getFields(slice(start, start + chunk))
@@ -0,0 +1,154 @@
+import csv
+import functools
+import io
+import json
+import time
+import tracemalloc
+
+class MetricsRegistry:
+    """In-memory store of the stage records produced while instrumentation
+       is enabled.
+    """
+    FIELDS = ('stage', 'duration', 'allocated', 'size')
+
+    def __init__(self) -> None:
+        self.records = []
+        self.callbacks = []
+
+    def record(self, stage: str, duration: float, allocated: int, size: int):
+        entry = {'stage': stage, 'duration': duration, 'allocated': allocated, 'size': size}
+        self.records.append(entry)
+        for callback in self.callbacks:
+            callback(entry)
+
+    def clear(self):
+        self.records = []
+
+    def summary(self):
+        """Aggregates the records per stage.
+
+        Returns:
+            dict: Stage name to count, total and max duration, max allocated
+                bytes and max problem size.
+        """
+        summary = {}
+        for entry in self.records:
+            s = summary.setdefault(entry['stage'], {
+                'count': 0, 'totalDuration': 0.0, 'maxDuration': 0.0, 'maxAllocated': 0, 'maxSize': 0})
+            s['count'] += 1
+            s['totalDuration'] += entry['duration']
+            s['maxDuration'] = max(s['maxDuration'], entry['duration'])
+            s['maxAllocated'] = max(s['maxAllocated'], entry['allocated'] or 0)
+            s['maxSize'] = max(s['maxSize'], entry['size'] or 0)
+        return summary
+
+    def toJSON(self, path: str = None):
+        """Exports the records and their summary as JSON, to path if given."""
+        text = json.dumps({'records': self.records, 'summary': self.summary()}, indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def toCSV(self, path: str = None):
+        """Exports the records as CSV, to path if given."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.FIELDS)
+        writer.writeheader()
+        writer.writerows(self.records)
+        text = buffer.getvalue()
+        if path is not None:
+            with open(path, 'w', newline='') as f:
+                f.write(text)
+        return text
+
+class _State:
+    enabled = False
+    traceMemory = False
+    # Open stages that trace memory, innermost last
+    stack = []
+
+registry = MetricsRegistry()
+
+def enable(traceMemory: bool = False, callback = None):
+    """Turns instrumentation on for every FEM1D and System.
+
+    Args:
+        traceMemory (bool, optional): Record allocated bytes per stage through
+            tracemalloc, which slows the stages down. Defaults to False.
+        callback (callable, optional): Called with every new record.
+    """
+    _State.enabled = True
+    _State.traceMemory = traceMemory
+    if traceMemory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if callback is not None:
+        registry.callbacks.append(callback)
+
+def disable():
+    _State.enabled = False
+    if _State.traceMemory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _State.traceMemory = False
+    _State.stack = []
+    registry.callbacks = []
+
+def isEnabled():
+    return _State.enabled
+
+class stage:
+    def __init__(self, name: str, size: int = None) -> None:
+        """Context manager that records one stage while instrumentation is
+           enabled and does nothing otherwise.
+
+        Args:
+            name (str): Stage name.
+            size (int, optional): Problem size of the stage, e.g. nNode.
+        """
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        if _State.enabled:
+            if _State.traceMemory:
+                current, peak = tracemalloc.get_traced_memory()
+                # Resetting erases the peak the enclosing stage has reached so far
+                if _State.stack:
+                    _State.stack[-1].peak = max(_State.stack[-1].peak, peak)
+                tracemalloc.reset_peak()
+                self.memStart = self.peak = current
+                _State.stack.append(self)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if _State.enabled:
+            duration = time.perf_counter() - self.start
+            allocated = None
+            if _State.traceMemory and _State.stack and _State.stack[-1] is self:
+                _State.stack.pop()
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                allocated = self.peak - self.memStart
+                if _State.stack:
+                    _State.stack[-1].peak = max(_State.stack[-1].peak, self.peak)
+            registry.record(self.name, duration, allocated, self.size)
+        return False
+
+def instrumented(name: str, size: str = 'nNode'):
+    """Decorates a method so every call is recorded as a stage. When
+       instrumentation is off the only cost is one flag check.
+
+    Args:
+        name (str): Stage name.
+        size (str, optional): Attribute of the instance holding the problem size.
+            Defaults to 'nNode'.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not _State.enabled:
+                return func(self, *args, **kwargs)
+            with stage(name, getattr(self, size, None)):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
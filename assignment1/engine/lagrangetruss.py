@@ -0,0 +1,59 @@
+from functools import lru_cache
+import numpy as np
+from .instrument import instrumented
+from .quadrature import lagrangeBasis, lagrangeTables
+from .truss import Truss
+
+class TrussLagrange(Truss):
+
+    def __init__(self, E: float, L: float, A: float, nElem: int, order: int = 2, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
+        """Truss with p-order Lagrange elements on equally spaced element
+           nodes. Stiffness and load tables come from cached Gauss-Legendre
+           quadrature, see quadrature.lagrangeTables.
+
+        Args:
+            E (float): Young's modulus.
+            L (float): Length of the Truss.
+            A (float): Cross-section area.
+            nElem (int): Number of Elements.
+            order (int, optional): Polynomial order p >= 1. Defaults to 2.
+            storage (str, optional): Global stiffness storage. Defaults to 'dense'.
+            x_node (np.ndarray, optional): Node coordinates of a non-uniform mesh,
+                see FEM1D.nodesFromVertices.
+            precision (str, optional): 'double' or 'mixed'. Defaults to 'double'.
+        """
+        if order < 1:
+            raise ValueError('Element order must be at least 1.')
+        super().__init__(E, L, A, nElem, nLocalNode = order + 1, storage = storage, x_node = x_node, precision = precision)
+        self.order = order
+        # p points integrate dN dN^T, a polynomial of order 2p - 2, exactly
+        _, w, _, dN = lagrangeTables(order, order)
+        self.localKUnit = self.E * self.A * 2 * (dN.T * w) @ dN
+        self.localK = self.localKUnit / self.lElem
+
+    def getLocalK(self, e: int):
+        return self.localKUnit / self.lElems[e]
+
+    def getLocalKBatch(self):
+        return self.localKUnit / self.lElems[:, None, None]
+
+    def shapeFunctions(self, ksi: np.ndarray):
+        return lagrangeBasis(self.order, ksi)[0]
+
+    def shapeDerivatives(self, ksi: np.ndarray):
+        return lagrangeBasis(self.order, ksi)[1]
+
+    def fieldTables(self, n: int = 20):
+        return _fieldTables(self.order, n)
+
+    @instrumented('formFGlobal')
+    def formFGlobal(self, qStart, qEnd, fStart, fEnd):
+        return self._formFGlobalLinearQ(qStart, qEnd, fStart, fEnd)
+
+@lru_cache(maxsize=None)
+def _fieldTables(order: int, n: int):
+    N, dN = lagrangeBasis(order, np.linspace(-1, 1, n))
+    N.flags.writeable = False
+    dN.flags.writeable = False
+    return N, dN
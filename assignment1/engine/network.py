@@ -0,0 +1,121 @@
+import numpy as np
+from .instrument import instrumented
+from .system import System
+
+class TrussNetwork:
+    def __init__(self, nodes: np.ndarray, members: np.ndarray, E, A, storage: str = 'sparse') -> None:
+        """Pin-jointed 2D or 3D truss of straight two-node bars. Every member
+           is the linear bar element of TrussLinear rotated into the global
+           axes, so KGlobal is assembled from (nMember, 2 dim, 2 dim) blocks
+           in one call. Global DOF dim * node + axis is displacement of node
+           along axis.
+
+        Args:
+            nodes (np.ndarray): (nNode, dim) node coordinates, dim is 2 or 3.
+            members (np.ndarray): (nMember, 2) start and end node of every member.
+            E (float or np.ndarray): Young's modulus, scalar or per member.
+            A (float or np.ndarray): Cross-section area, scalar or per member.
+            storage (str, optional): Global stiffness storage. Defaults to 'sparse',
+                network numbering rarely gives a narrow band.
+        """
+        self.nodes = np.asarray(nodes, dtype=float)
+        self.members = np.asarray(members, dtype=np.int64).reshape((-1, 2))
+        if self.nodes.ndim != 2 or self.nodes.shape[1] not in (2, 3):
+            raise ValueError('nodes must be an (nNode, 2) or (nNode, 3) array.')
+        self.nNode, self.dim = self.nodes.shape
+        self.nMember = self.members.shape[0]
+        if self.members.min() < 0 or self.members.max() >= self.nNode:
+            raise ValueError(f'Member nodes must lie in [0, {self.nNode}).')
+        self.E = np.broadcast_to(np.asarray(E, dtype=float), (self.nMember,))
+        self.A = np.broadcast_to(np.asarray(A, dtype=float), (self.nMember,))
+
+        d = self.nodes[self.members[:, 1]] - self.nodes[self.members[:, 0]]
+        self.lengths = np.linalg.norm(d, axis=1)
+        if np.any(self.lengths == 0):
+            raise ValueError('Members must have non-zero length.')
+        self.cosines = d / self.lengths[:, None]
+        # DOFs of the start node followed by the end node of every member
+        self.conn = (self.members[:, :, None] * self.dim + np.arange(self.dim)).reshape((self.nMember, -1))
+        self.nDOF = self.nNode * self.dim
+        self.system = System(self.nDOF, storage)
+        self.solution = None
+        self.reactions = None
+
+    def getLocalKBatch(self):
+        """Rotated member stiffness matrices, EA / L [[1, -1], [-1, 1]] (x) c c^T.
+
+        Returns:
+            np.ndarray: (nMember, 2 dim, 2 dim) stack of member matrices.
+        """
+        k = self.E * self.A / self.lengths
+        cc = self.cosines[:, :, None] * self.cosines[:, None, :]
+        sign = np.array([[1.0, -1.0], [-1.0, 1.0]])
+        KLocal = k[:, None, None, None, None] * sign[None, :, None, :, None] * cc[:, None, :, None, :]
+        return KLocal.reshape((self.nMember, 2 * self.dim, 2 * self.dim))
+
+    @instrumented('formKGlobal', 'nDOF')
+    def formKGlobal(self):
+        KGlobal = self.system.storage.assemble(self.nDOF, self.conn, self.getLocalKBatch())
+        self.system.KGlobal = KGlobal
+        return KGlobal
+
+    @instrumented('formFGlobal', 'nDOF')
+    def formFGlobal(self, loads: np.ndarray):
+        """Forms the global load vector from nodal forces.
+
+        Args:
+            loads (np.ndarray): (nNode, dim) force components at every node.
+
+        Returns:
+            np.ndarray: (nDOF, 1) global load vector.
+        """
+        FGlobal = np.asarray(loads, dtype=float).reshape((self.nDOF, 1)).copy()
+        self.system.FGlobal = FGlobal
+        return FGlobal
+
+    def formSupports(self, nodes, fixed: np.ndarray = None, values: np.ndarray = None, springs = None):
+        """Applies supports at the given nodes.
+
+        Args:
+            nodes (array_like): (nSupport,) supported node indices.
+            fixed (np.ndarray, optional): (nSupport, dim) boolean mask of the
+                restrained directions, e.g. [False, True] for a 2D roller.
+                Defaults to pins restrained in every direction.
+            values (np.ndarray, optional): (nSupport, dim) prescribed
+                displacements of the restrained directions. Defaults to zero.
+            springs (tuple, optional): (dofs, k) arrays of grounded springs on
+                global DOFs. Defaults to None.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64).reshape(-1)
+        shape = (nodes.size, self.dim)
+        fixed = np.ones(shape, dtype=bool) if fixed is None else np.broadcast_to(np.asarray(fixed, dtype=bool), shape)
+        values = np.zeros(shape) if values is None else np.broadcast_to(np.asarray(values, dtype=float), shape)
+        dofs = nodes[:, None] * self.dim + np.arange(self.dim)
+        self.system.formConstraints(dofs[fixed], values[fixed].reshape((-1, 1)), springs)
+
+    def solve(self):
+        """Solves for the nodal displacements.
+
+        Returns:
+            np.ndarray: (nNode, dim) displacements. The (nDOF, 1) solution and
+                the reactions at the restrained DOFs are kept as self.solution
+                and self.reactions.
+        """
+        self.solution = self.system.solve()
+        self.reactions = self.system.reactions
+        return self.solution.reshape((self.nNode, self.dim))
+
+    @instrumented('getStress', 'nMember')
+    def getStress(self):
+        """Member axial stresses, positive in tension.
+
+        Returns:
+            np.ndarray: (nMember,) axial stresses E * elongation / L.
+        """
+        u = self.solution.reshape((self.nNode, self.dim))
+        elongation = np.einsum('md,md->m', u[self.members[:, 1]] - u[self.members[:, 0]], self.cosines)
+        return self.E * elongation / self.lengths
+
+    def getAxialForce(self):
+        """Member axial forces A * stress, positive in tension."""
+        return self.A * self.getStress()
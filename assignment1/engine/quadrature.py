@@ -0,0 +1,60 @@
+from functools import lru_cache
+import numpy as np
+
+@lru_cache(maxsize=None)
+def gaussLegendre(nPoint: int):
+    """Gauss-Legendre points and weights on [-1, 1], built once per process.
+
+    Args:
+        nPoint (int): Number of quadrature points.
+
+    Returns:
+        tuple: (ksi, w) read-only arrays of shape (nPoint,).
+    """
+    ksi, w = np.polynomial.legendre.leggauss(nPoint)
+    ksi.flags.writeable = False
+    w.flags.writeable = False
+    return ksi, w
+
+def lagrangeBasis(order: int, ksi: np.ndarray):
+    """Evaluates the Lagrange shape functions of the given order on equally
+       spaced element nodes and their derivatives w.r.t. ksi.
+
+    Args:
+        order (int): Polynomial order p, the element has p + 1 nodes.
+        ksi (np.ndarray): Natural coordinates in [-1, 1].
+
+    Returns:
+        tuple: (N, dN) arrays of shape (len(ksi), p + 1).
+    """
+    ksi = np.asarray(ksi, dtype=float)
+    nodes = np.linspace(-1, 1, order + 1)
+    diff = ksi[:, None] - nodes[None, :]
+    N = np.ones((ksi.size, order + 1))
+    dN = np.zeros((ksi.size, order + 1))
+    for a in range(order + 1):
+        others = np.delete(np.arange(order + 1), a)
+        denom = np.prod(nodes[a] - nodes[others])
+        N[:, a] = np.prod(diff[:, others], axis=1) / denom
+        for b in others:
+            rest = others[others != b]
+            dN[:, a] += np.prod(diff[:, rest], axis=1) / denom
+    return N, dN
+
+@lru_cache(maxsize=None)
+def lagrangeTables(order: int, nPoint: int):
+    """Gauss-Legendre points, weights and the Lagrange shape function
+       tables at those points, built once per process.
+
+    Args:
+        order (int): Polynomial order p.
+        nPoint (int): Number of quadrature points.
+
+    Returns:
+        tuple: (ksi, w, N, dN) read-only arrays, N and dN of shape (nPoint, p + 1).
+    """
+    ksi, w = gaussLegendre(nPoint)
+    N, dN = lagrangeBasis(order, ksi)
+    N.flags.writeable = False
+    dN.flags.writeable = False
+    return ksi, w, N, dN
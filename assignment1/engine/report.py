@@ -0,0 +1,146 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import numpy as np
+
+# Output format and raster resolution of every render mode
+MODES = {
+    'full': ('png', 600),
+    'fast': ('png', 150),
+    'vector': ('svg', None),
+}
+
+def seriesWithNodes(label: str, color: str, shape: str, alpha: float, solution: tuple):
+    """Line of a displacement field with markers at the nodal solution.
+
+    Args:
+        label (str): Legend label.
+        color (str): Matplotlib color letter.
+        shape (str): Marker letter, '' for none.
+        alpha (float): Line opacity.
+        solution (tuple): (x_node, solution, x, u, sigma) as returned by the drivers.
+    """
+    x_node, sol, x, u = solution[:4]
+    return {'label': label, 'color': color, 'shape': shape, 'alpha': alpha,
+            'nodes': np.asarray(x_node), 'sol': np.asarray(sol), 'x': np.asarray(x), 'y': np.asarray(u)}
+
+def series(label: str, color: str, alpha: float, x: np.ndarray, y: np.ndarray):
+    """Plain line of a field, e.g. stress against x."""
+    return {'label': label, 'color': color, 'alpha': alpha, 'x': np.asarray(x), 'y': np.asarray(y)}
+
+def figureSpec(filename: str, title: str, xlabel: str, ylabel: str, lines: list, size: tuple = (12.5, 7.5)):
+    """Describes one figure as plain data, so it can be hashed and sent to
+       a worker process.
+
+    Args:
+        filename (str): Output path, its extension is replaced in vector mode.
+        title (str): Axes title.
+        xlabel (str): x axis label.
+        ylabel (str): y axis label.
+        lines (list): Series from series and seriesWithNodes.
+        size (tuple, optional): Figure size in inches. Defaults to (12.5, 7.5).
+    """
+    return {'filename': filename, 'title': title, 'xlabel': xlabel, 'ylabel': ylabel,
+            'lines': lines, 'size': tuple(size)}
+
+def outputName(spec: dict, mode: str = 'full'):
+    extension, _ = MODES[mode]
+    return os.path.splitext(spec['filename'])[0] + '.' + extension
+
+def specHash(spec: dict, mode: str = 'full'):
+    """SHA-256 of everything that affects the rendered file."""
+    digest = hashlib.sha256()
+    text = {key: value for key, value in spec.items() if key != 'lines'}
+    digest.update(json.dumps([text, mode], sort_keys=True).encode())
+    for line in spec['lines']:
+        for key in sorted(line):
+            digest.update(key.encode())
+            value = line[key]
+            if isinstance(value, np.ndarray):
+                digest.update(np.ascontiguousarray(value, dtype=float).tobytes())
+            else:
+                digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+def renderFigure(spec: dict, mode: str = 'full'):
+    """Renders and saves one figure. matplotlib is imported here on first
+       use with the non-interactive Agg backend.
+
+    Returns:
+        str: Path of the saved file.
+    """
+    import matplotlib
+    if 'matplotlib.pyplot' not in sys.modules:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    _, dpi = MODES[mode]
+    fig, ax = plt.subplots(nrows=1, ncols=1, sharey=True)
+    fig.set_size_inches(*spec['size'])
+    for line in spec['lines']:
+        if 'nodes' in line:
+            ax.plot(0, 0, line['color'] + line['shape'] + '-', label = line['label'], linewidth = 2, alpha = line['alpha'])
+            ax.plot(line['nodes'], line['sol'], line['color'] + line['shape'], linewidth = 2, alpha = line['alpha'])
+            ax.plot(line['x'], line['y'], line['color'] + '-', linewidth = 2, alpha = line['alpha'])
+        else:
+            ax.plot(line['x'], line['y'], line['color'] + '-', label = line['label'], linewidth = 2, alpha = line['alpha'])
+    ax.set(title = spec['title'], ylabel = spec['ylabel'], xlabel = spec['xlabel'])
+    ax.legend(loc='best')
+    ax.grid(True)
+    filename = outputName(spec, mode)
+    fig.savefig(filename, dpi=dpi)
+    plt.close(fig)
+    return filename
+
+def _render(job):
+    spec, mode = job
+    return renderFigure(spec, mode)
+
+def renderFigures(specs: list, mode: str = 'full', processes: int = None, force: bool = False,
+                  manifest: str = '.figures.json'):
+    """Renders the figures whose data changed since the last run across a
+       process pool. The hash of every rendered figure is kept in manifest,
+       a figure is skipped when its file exists and its hash is unchanged.
+
+    Args:
+        specs (list): Figure specs from figureSpec.
+        mode (str, optional): 'full' for 600 dpi PNG, 'fast' for 150 dpi PNG or
+            'vector' for SVG. Defaults to 'full'.
+        processes (int, optional): Pool size, 1 renders in-process. Defaults to os.cpu_count().
+        force (bool, optional): Render every figure. Defaults to False.
+        manifest (str, optional): Hash manifest path. Defaults to '.figures.json'.
+
+    Returns:
+        tuple: (rendered, skipped) lists of file paths.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown mode {mode!r}, expected one of {list(MODES)}.')
+    try:
+        with open(manifest) as f:
+            hashes = json.load(f)
+    except (OSError, ValueError):
+        hashes = {}
+
+    jobs, skipped, pending = [], [], {}
+    for spec in specs:
+        filename = outputName(spec, mode)
+        digest = specHash(spec, mode)
+        if not force and hashes.get(filename) == digest and os.path.exists(filename):
+            skipped.append(filename)
+            continue
+        jobs.append((spec, mode))
+        pending[filename] = digest
+
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes <= 1:
+        rendered = [_render(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            rendered = list(pool.imap_unordered(_render, jobs))
+
+    hashes.update(pending)
+    with open(manifest, 'w') as f:
+        json.dump(hashes, f, indent=2)
+    return rendered, skipped
@@ -0,0 +1,507 @@
+import argparse
+import asyncio
+import inspect
+import json
+import numbers
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch import TrussBatch
+from .lagrangetruss import TrussLagrange
+from .storage import STORAGES
+from .sweep import LOAD_PARAMS
+from .taperedtruss import TaperedTrussLinear, TaperedTrussQuadratic
+from .truss import TrussLinear, TrussQuadratic
+
+PORT = 8413
+ELEMENTS = {cls.__name__: cls for cls in
+            (TrussLinear, TrussQuadratic, TaperedTrussLinear, TaperedTrussQuadratic, TrussLagrange)}
+FIELDS = ('solution', 'reactions', 'x', 'u', 'strain', 'sigma')
+# Models TrussBatch can stack and the largest mesh its batched dense solve pays off for
+BATCH_ELEMENTS = ('TrussLinear', 'TrussQuadratic', 'TaperedTrussLinear', 'TaperedTrussQuadratic')
+BATCH_PARAMS = {'E', 'L', 'A', 'A0', 'h1', 'h2', 'nElem', 'storage'}
+BATCH_NODES = 129
+# Parameters batchKey and the constructors do arithmetic with
+INT_PARAMS = ('nElem', 'order')
+REAL_PARAMS = ('E', 'L', 'A', 'A0', 'h1', 'h2')
+# Largest request line, nodal coordinates of non-uniform meshes travel inline
+LINE_LIMIT = 1 << 24
+
+def parseJob(message: dict):
+    """Validates a job spec and fills in its defaults.
+
+       A job is a JSON object with the keys
+       'element': class name, one of ELEMENTS,
+       'params': constructor arguments of the class,
+       'loads': [qStart, qEnd, fStart, fEnd] or an object of those names,
+       'boundary': [u0, uL] for formDirichlet, null for formDirichletNeumann,
+       'fields': names from FIELDS, defaults to ['solution'],
+       'n': field points per element, defaults to 20,
+       and an optional 'id' echoed in the response.
+
+    Raises:
+        ValueError: If the spec is malformed.
+
+    Returns:
+        dict: Normalized job.
+    """
+    if not isinstance(message, dict):
+        raise ValueError('A job must be a JSON object.')
+    element = message.get('element')
+    if element not in ELEMENTS:
+        raise ValueError(f'Unknown element {element!r}, expected one of {list(ELEMENTS)}.')
+    params = message.get('params', {})
+    if not isinstance(params, dict):
+        raise ValueError('params must be a JSON object.')
+    try:
+        inspect.signature(ELEMENTS[element]).bind(**params)
+    except TypeError as e:
+        raise ValueError(f'Invalid params for {element}: {e}.') from None
+    for name in INT_PARAMS:
+        value = params.get(name, 1)
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral) or value < 1:
+            raise ValueError(f'{name} must be a positive integer, got {value!r}.')
+    for name in REAL_PARAMS:
+        value = params.get(name, 1.0)
+        if isinstance(value, bool) or not isinstance(value, numbers.Real) or not np.isfinite(value):
+            raise ValueError(f'{name} must be a real number, got {value!r}.')
+    if params.get('storage', 'dense') not in STORAGES:
+        raise ValueError(f"Unknown storage {params['storage']!r}, expected one of {list(STORAGES)}.")
+    loads = message.get('loads', [0.0] * 4)
+    if isinstance(loads, dict):
+        loads = [loads.get(name, 0.0) for name in LOAD_PARAMS]
+    boundary = message.get('boundary')
+    fields = message.get('fields', ['solution'])
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'Unknown fields {sorted(unknown)}, expected some of {list(FIELDS)}.')
+    n = message.get('n', 20)
+    try:
+        loads = [float(v) for v in loads]
+        boundary = None if boundary is None else [float(v) for v in boundary]
+        n = int(n)
+    except (TypeError, ValueError):
+        raise ValueError('loads, boundary and n must be numbers.') from None
+    if len(loads) != 4 or (boundary is not None and len(boundary) != 2) or n < 2:
+        raise ValueError('Expected 4 loads, 2 boundary values and n >= 2.')
+    return {'element': element, 'params': params, 'loads': loads, 'boundary': boundary,
+            'fields': list(fields), 'n': n}
+
+def batchKey(job: dict):
+    """Groups jobs that are solved together. Jobs of one model differing
+       only in their loads share a factorization, small uniform meshes of
+       the same element and size are stacked in a TrussBatch.
+    """
+    params = job['params']
+    cls = ELEMENTS[job['element']]
+    nNode = params.get('nElem', 0) * (2 if issubclass(cls, TrussQuadratic) else 1) + 1
+    if (job['element'] in BATCH_ELEMENTS and set(params) <= BATCH_PARAMS and nNode <= BATCH_NODES
+            and 'reactions' not in job['fields']):
+        return ('stacked', job['element'], params.get('L'), params.get('nElem'), job['boundary'] is None)
+    return ('shared', job['element'], json.dumps(params, sort_keys=True), json.dumps(job['boundary']))
+
+def _pack(fields: list, values: dict):
+    return {name: np.asarray(values[name]).ravel().tolist() for name in fields}
+
+def _solveShared(jobs):
+    job = jobs[0]
+    model = ELEMENTS[job['element']](**job['params'])
+    model.formKGlobal()
+    F = np.hstack([model.formFGlobal(*j['loads']) for j in jobs])
+    if job['boundary'] is None:
+        model.formDirichletNeumann()
+    else:
+        model.formDirichlet(*job['boundary'])
+    D = model.solve(F)
+    reactions = model.system.reactions
+    results = []
+    for i, j in enumerate(jobs):
+        model.solution = D[:, [i]]
+        values = {'solution': model.solution, 'reactions': reactions[:, i]}
+        if set(j['fields']) & {'x', 'u', 'strain', 'sigma'}:
+            values['x'], values['u'], values['strain'] = model.getFields(j['n'])
+            values['sigma'] = model.E * values['strain']
+        results.append(_pack(j['fields'], values))
+    return results
+
+def _solveStacked(jobs):
+    params = [j['params'] for j in jobs]
+    area = [p.get('A', p.get('A0')) for p in params]
+    h1 = [p.get('h1', 1.0) for p in params]
+    h2 = [p.get('h2', p.get('h1', 1.0)) for p in params]
+    E = np.array([p['E'] for p in params], dtype=float)
+    batch = TrussBatch(ELEMENTS[jobs[0]['element']], params[0]['L'], params[0]['nElem'], E, area, h1, h2)
+    batch.formKGlobal()
+    batch.formFGlobal(*np.array([j['loads'] for j in jobs]).T)
+    if jobs[0]['boundary'] is None:
+        batch.formDirichletNeumann()
+    else:
+        batch.formDirichlet(*np.array([j['boundary'] for j in jobs]).T)
+    solution = batch.solve()
+    fields = {}
+    for n in {j['n'] for j in jobs if set(j['fields']) & {'x', 'u', 'strain', 'sigma'}}:
+        fields[n] = (batch.getXField(n), batch.getDispField(n), batch.getStrainField(n))
+    results = []
+    for b, j in enumerate(jobs):
+        values = {'solution': solution[b]}
+        if j['n'] in fields:
+            x, u, strain = fields[j['n']]
+            values.update(x=x, u=u[b], strain=strain[b], sigma=E[b] * strain[b])
+        results.append(_pack(j['fields'], values))
+    return results
+
+def solveGroup(kind: str, jobs: list):
+    """Solves a group of jobs with the same batchKey in a worker process.
+       A failing group is retried job by job so one bad spec only fails
+       itself.
+
+    Args:
+        kind (str): 'shared' or 'stacked', the first item of the batchKey.
+        jobs (list): Normalized jobs from parseJob.
+
+    Returns:
+        tuple: (results, seconds), one dict of field name to list per job,
+            or {'error': message} for a failed job.
+    """
+    start = time.perf_counter()
+    solve = _solveStacked if kind == 'stacked' else _solveShared
+    try:
+        results = solve(jobs)
+    except Exception as e:
+        if len(jobs) == 1:
+            results = [{'error': f'{type(e).__name__}: {e}'}]
+        else:
+            results = [solveGroup('shared', [job])[0][0] for job in jobs]
+    return results, time.perf_counter() - start
+
+def _warm():
+    # Runs once per worker, so the first real job finds the imports, the
+    # quadrature and field tables and the LAPACK bindings ready
+    for element, params in (('TrussLinear', {'E': 1, 'L': 1, 'A': 1, 'nElem': 4}),
+                            ('TrussQuadratic', {'E': 1, 'L': 1, 'A': 1, 'nElem': 4, 'storage': 'banded'}),
+                            ('TrussLagrange', {'E': 1, 'L': 1, 'A': 1, 'nElem': 4, 'storage': 'sparse'})):
+        job = {'element': element, 'params': params, 'loads': [1.0, 1.0, 0.0, 0.0], 'boundary': None,
+               'fields': list(FIELDS), 'n': 20}
+        solveGroup('shared', [job])
+
+def _ping():
+    return os.getpid()
+
+class ServerStats:
+    def __init__(self, window: int = 10000) -> None:
+        """Latency and throughput counters of a JobServer. Latency runs from
+           reading a job to writing its response. Percentiles cover the last
+           window jobs.
+        """
+        self.started = time.perf_counter()
+        self.received = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.batchedJobs = 0
+        self.solveTime = 0.0
+        self.latencies = deque(maxlen=window)
+        self.finished = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        self.completed += 1
+        self.failed += not ok
+        self.latencies.append(latency)
+        self.finished.append(time.perf_counter())
+
+    def summary(self, queued: int = 0, inFlight: int = 0):
+        """Current counters.
+
+        Returns:
+            dict: Job counts, queue depth, mean batch size, worker solve time,
+                latency percentiles in seconds and throughput in jobs per
+                second over the uptime and over the last minute.
+        """
+        now = time.perf_counter()
+        uptime = now - self.started
+        latency = np.array(self.latencies)
+        p50, p95, p99 = np.percentile(latency, (50, 95, 99)) if latency.size else (0.0, 0.0, 0.0)
+        recent = sum(t > now - 60 for t in self.finished)
+        return {
+            'uptime': uptime, 'received': self.received, 'completed': self.completed, 'failed': self.failed,
+            'queued': queued, 'inFlight': inFlight, 'batches': self.batches,
+            'meanBatchSize': self.batchedJobs / self.batches if self.batches else 0.0,
+            'solveTime': self.solveTime,
+            'latencyMean': float(latency.mean()) if latency.size else 0.0,
+            'latencyP50': float(p50), 'latencyP95': float(p95), 'latencyP99': float(p99),
+            'latencyMax': float(latency.max()) if latency.size else 0.0,
+            'throughput': self.completed / uptime if uptime > 0 else 0.0,
+            'throughputRecent': recent / min(60.0, uptime) if uptime > 0 else 0.0,
+        }
+
+class _Connection:
+    def __init__(self, writer) -> None:
+        self.writer = writer
+        self.lock = asyncio.Lock()
+
+    async def send(self, message: dict):
+        # Responses of a closed client are dropped, slow clients hold only their own batch
+        async with self.lock:
+            if self.writer.is_closing():
+                return
+            self.writer.write(json.dumps(message).encode() + b'\n')
+            try:
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+
+class JobServer:
+    def __init__(self, processes: int = None, maxPending: int = 1024, batchSize: int = 64,
+                 batchDelay: float = 0.002) -> None:
+        """Long-lived solve server. Clients send one JSON job per line, see
+           parseJob, and receive one JSON response per line in completion
+           order, {'id', 'ok', 'result'} or {'id', 'ok': False, 'error'}.
+           A line {'op': 'stats'} returns the ServerStats summary.
+
+           Jobs wait in a queue of maxPending entries. Once it is full the
+           server stops reading from the sockets, so clients are slowed by
+           their own send buffers. Jobs arriving within batchDelay of each
+           other are grouped by batchKey and at most two groups per worker
+           are in flight.
+
+        Args:
+            processes (int, optional): Warm worker processes. Defaults to os.cpu_count().
+            maxPending (int, optional): Queue length. Defaults to 1024.
+            batchSize (int, optional): Most jobs in one group. Defaults to 64.
+            batchDelay (float, optional): Seconds to wait for more jobs after
+                the first one. Defaults to 0.002.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.maxPending = maxPending
+        self.batchSize = batchSize
+        self.batchDelay = batchDelay
+        self.stats = ServerStats()
+        self.pool = None
+        self.server = None
+        self.inFlight = 0
+        self._queue = None
+        self._slots = None
+        self._tasks = set()
+        self._handlers = {}
+        self.path = None
+
+    async def start(self, path: str = None, host: str = '127.0.0.1', port: int = PORT):
+        """Starts the workers, waits until every one is warm and listens on
+           the Unix socket path, or on host:port if path is None.
+        """
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.maxPending)
+        self._slots = asyncio.Semaphore(2 * self.processes)
+        self.pool = ProcessPoolExecutor(self.processes, initializer=_warm)
+        # Each worker blocks in _ping until it has warmed up
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.processes)))
+        self._spawn(self._dispatch())
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self.path = path
+            self.server = await asyncio.start_unix_server(self._handle, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+        return self.server
+
+    async def serveForever(self):
+        """Serves until SIGINT or SIGTERM, then closes the server."""
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+            await self.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        # Closing the sockets ends the open handlers at their next read
+        for writer in self._handlers.values():
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        for task in list(self._tasks):
+            task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _handle(self, reader, writer):
+        connection = _Connection(writer)
+        handler = asyncio.current_task()
+        self._handlers[handler] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await connection.send({'id': None, 'ok': False, 'error': 'Request line too long.'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                received = time.perf_counter()
+                try:
+                    message = json.loads(line)
+                except ValueError as e:
+                    await connection.send({'id': None, 'ok': False, 'error': f'Invalid JSON: {e}.'})
+                    continue
+                jobId = message.get('id') if isinstance(message, dict) else None
+                if isinstance(message, dict) and message.get('op') == 'stats':
+                    stats = self.stats.summary(self._queue.qsize(), self.inFlight)
+                    await connection.send({'id': jobId, 'ok': True, 'stats': stats})
+                    continue
+                self.stats.received += 1
+                try:
+                    job = parseJob(message)
+                except ValueError as e:
+                    self.stats.record(time.perf_counter() - received, False)
+                    await connection.send({'id': jobId, 'ok': False, 'error': str(e)})
+                    continue
+                # Blocks while the queue is full, which stops reading this socket
+                await self._queue.put((connection, jobId, job, received))
+        except ConnectionError:
+            pass
+        finally:
+            del self._handlers[handler]
+            writer.close()
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.batchDelay
+            limit = self.batchSize * self.processes
+            while len(pending) < limit:
+                if not self._queue.empty():
+                    pending.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for entry in pending:
+                try:
+                    key = batchKey(entry[2])
+                except Exception as e:
+                    # A job that cannot be grouped fails alone, the dispatcher keeps running
+                    self._spawn(self._reply(entry, {'error': f'{type(e).__name__}: {e}'}))
+                    continue
+                groups.setdefault(key, []).append(entry)
+            for key, entries in groups.items():
+                for start in range(0, len(entries), self.batchSize):
+                    await self._slots.acquire()
+                    self._spawn(self._run(key[0], entries[start:start + self.batchSize]))
+
+    async def _run(self, kind, entries):
+        loop = asyncio.get_running_loop()
+        self.inFlight += len(entries)
+        self.stats.batches += 1
+        self.stats.batchedJobs += len(entries)
+        try:
+            results, seconds = await loop.run_in_executor(self.pool, solveGroup, kind, [e[2] for e in entries])
+            self.stats.solveTime += seconds
+        except Exception as e:
+            # A crashed worker fails its whole group
+            results = [{'error': f'{type(e).__name__}: {e}'}] * len(entries)
+        finally:
+            self._slots.release()
+            self.inFlight -= len(entries)
+        for entry, result in zip(entries, results):
+            await self._reply(entry, result)
+
+    async def _reply(self, entry, result):
+        connection, jobId, _, received = entry
+        ok = 'error' not in result
+        if ok:
+            await connection.send({'id': jobId, 'ok': True, 'result': result})
+        else:
+            await connection.send({'id': jobId, 'ok': False, 'error': result['error']})
+        self.stats.record(time.perf_counter() - received, ok)
+
+async def streamJobs(jobs, path: str = None, host: str = '127.0.0.1', port: int = PORT):
+    """Sends jobs to a JobServer and yields the responses as they arrive.
+       Jobs without an 'id' are numbered by their position.
+
+    Args:
+        jobs (iterable): Job specs, see parseJob.
+        path (str, optional): Unix socket of the server. Defaults to host:port.
+        host (str, optional): Server host. Defaults to '127.0.0.1'.
+        port (int, optional): Server port. Defaults to PORT.
+
+    Yields:
+        dict: One response per job, in completion order.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    jobs = [{'id': i, **job} for i, job in enumerate(jobs)]
+
+    async def send():
+        for job in jobs:
+            writer.write(json.dumps(job).encode() + b'\n')
+            await writer.drain()
+
+    sender = asyncio.ensure_future(send())
+    try:
+        for _ in jobs:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError('Server closed the connection.')
+            yield json.loads(line)
+        await sender
+    finally:
+        sender.cancel()
+        writer.close()
+
+def runJobs(jobs, path: str = None, host: str = '127.0.0.1', port: int = PORT):
+    """Blocking streamJobs for synchronous callers.
+
+    Returns:
+        list: Responses in completion order.
+    """
+    async def collect():
+        return [response async for response in streamJobs(jobs, path, host, port)]
+    return asyncio.run(collect())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serves truss solve jobs over a Unix socket or localhost.')
+    parser.add_argument('--socket', help='Unix socket path, overrides --host and --port.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--batch-delay', type=float, default=0.002)
+    args = parser.parse_args()
+
+    async def main():
+        server = JobServer(args.processes, args.max_pending, args.batch_size, args.batch_delay)
+        await server.start(args.socket, args.host, args.port)
+        print(f'serving on {args.socket or f"{args.host}:{args.port}"} with {server.processes} workers', flush=True)
+        await server.serveForever()
+
+    asyncio.run(main())
@@ -0,0 +1,293 @@
+import numpy as np
+
+try:
+    import scipy.linalg as sla
+    import scipy.linalg.lapack as lapack
+    import scipy.sparse as sp
+    import scipy.sparse.linalg as spla
+except ImportError:
+    sla = None
+    lapack = None
+    sp = None
+    spla = None
+
+class Storage:
+    """Storage backend of the global stiffness matrix. Decides how KGlobal
+       is assembled, how it is partitioned into the unknown/known blocks
+       and how the reduced system is solved.
+    """
+    name = None
+
+    def assemble(self, nNode: int, conn: np.ndarray, KLocal: np.ndarray):
+        """Assembles the global stiffness matrix from element matrices.
+
+        Args:
+            nNode (int): Number of global nodes.
+            conn (np.ndarray): (nElem, n) connectivity array.
+            KLocal (np.ndarray): (nElem, n, n) stack of element matrices.
+
+        Raises:
+            NotImplementedError: Base Storage does not define a format.
+        """
+        raise NotImplementedError
+
+    def principal(self, K, idx: np.ndarray):
+        """Extracts the square block K[idx, idx] in the same format as K."""
+        raise NotImplementedError
+
+    def block(self, K, rows: np.ndarray, cols: np.ndarray):
+        """Extracts the block K[rows, cols] as a dense or CSR matrix."""
+        raise NotImplementedError
+
+    def factor(self, K):
+        """Factorizes a matrix returned by principal once.
+
+        Args:
+            K: Square matrix in this storage format.
+
+        Raises:
+            NotImplementedError: Base Storage does not define a format.
+
+        Returns:
+            callable: solve(F) that returns K^-1 F for a (n, nCases) F.
+        """
+        raise NotImplementedError
+
+    def addDiagonal(self, K, idx: np.ndarray, values: np.ndarray):
+        """Adds values to the diagonal entries K[idx, idx] of a matrix returned
+           by principal, in place where the format allows it.
+        """
+        raise NotImplementedError
+
+    def matvec(self, K, x: np.ndarray):
+        """Returns K @ x for a matrix returned by principal."""
+        raise NotImplementedError
+
+    def combine(self, a: float, K, b: float, M):
+        """Returns a K + b M for two matrices in this storage format."""
+        return a * K + b * M
+
+    def congruence(self, K, T):
+        """Returns T^T K T in this storage format.
+
+        Args:
+            K: Symmetric square matrix returned by principal.
+            T: (n, m) scipy sparse transformation matrix.
+        """
+        raise NotImplementedError
+
+    def toDense(self, K):
+        raise NotImplementedError
+
+    @staticmethod
+    def _scatterIndices(conn: np.ndarray):
+        rows = np.repeat(conn, conn.shape[1], axis=1)
+        cols = np.tile(conn, (1, conn.shape[1]))
+        return rows.ravel(), cols.ravel()
+
+class DenseStorage(Storage):
+    name = 'dense'
+
+    def assemble(self, nNode, conn, KLocal):
+        KGlobal = np.zeros((nNode, nNode), dtype=KLocal.dtype)
+        np.add.at(KGlobal, (conn[:, :, None], conn[:, None, :]), KLocal)
+        return KGlobal
+
+    def principal(self, K, idx):
+        return K[np.ix_(idx, idx)]
+
+    def block(self, K, rows, cols):
+        return K[np.ix_(rows, cols)]
+
+    def factor(self, K):
+        if sla is None:
+            # No reusable factorization in numpy, at least batch the right-hand sides
+            return lambda F: np.linalg.solve(K, F)
+        try:
+            c = sla.cho_factor(K)
+            return lambda F: sla.cho_solve(c, F)
+        except np.linalg.LinAlgError:
+            lu = sla.lu_factor(K)
+            return lambda F: sla.lu_solve(lu, F)
+
+    def addDiagonal(self, K, idx, values):
+        np.add.at(K, (idx, idx), values)
+        return K
+
+    def matvec(self, K, x):
+        return K @ x
+
+    def congruence(self, K, T):
+        # T is sparse, T^T K is formed first so that K is only read once
+        return np.asarray(T.T @ np.asarray(T.T @ K).T)
+
+    def toDense(self, K):
+        return K
+
+class BandedStorage(Storage):
+    """Stores K in LAPACK general band layout, ab[b + i - j, j] = K[i, j],
+       where b is the half bandwidth of the mesh.
+    """
+    name = 'banded'
+
+    def __init__(self) -> None:
+        if sla is None:
+            raise ImportError('Banded storage requires scipy.')
+
+    def assemble(self, nNode, conn, KLocal):
+        b = int(np.max(conn.max(axis=1) - conn.min(axis=1)))
+        ab = np.zeros((2 * b + 1, nNode), dtype=KLocal.dtype)
+        rows, cols = self._scatterIndices(conn)
+        np.add.at(ab, (b + rows - cols, cols), KLocal.ravel())
+        return ab
+
+    def principal(self, K, idx):
+        b = K.shape[0] // 2
+        m = idx.size
+        ab = np.zeros((2 * b + 1, m), dtype=K.dtype)
+        # Removing rows and columns never widens the band, walk it diagonal by diagonal
+        for d in range(-b, b + 1):
+            q = np.arange(max(0, -d), min(m, m - d))
+            offset = idx[q + d] - idx[q]
+            valid = np.abs(offset) <= b
+            q = q[valid]
+            ab[b + d, q] = K[b + offset[valid], idx[q]]
+        return ab
+
+    def block(self, K, rows, cols):
+        b = K.shape[0] // 2
+        nNode = K.shape[1]
+        rowMap = np.full(nNode, -1, dtype=np.int64)
+        rowMap[rows] = np.arange(rows.size)
+        d = np.arange(-b, b + 1)[:, None]
+        i = cols[None, :] + d
+        inside = (i >= 0) & (i < nNode)
+        i = np.where(inside, i, 0)
+        valid = inside & (rowMap[i] >= 0)
+        q = np.broadcast_to(np.arange(cols.size), i.shape)
+        data = K[b + d, cols[None, :]]
+        return sp.csr_matrix((data[valid], (rowMap[i[valid]], q[valid])),
+                             shape=(rows.size, cols.size))
+
+    def factor(self, K):
+        b = K.shape[0] // 2
+        n = K.shape[1]
+        if n <= b:
+            return DenseStorage().factor(self.toDense(K))
+        try:
+            # Symmetric positive definite band, LAPACK pbtrf
+            c = sla.cholesky_banded(K[:b + 1])
+            return lambda F: sla.cho_solve_banded((c, False), F)
+        except np.linalg.LinAlgError:
+            # General band LU, LAPACK gbtrf needs b extra rows for fill-in
+            ab = np.zeros((3 * b + 1, n), dtype=K.dtype)
+            ab[b:] = K
+            gbtrf, gbtrs = lapack.get_lapack_funcs(('gbtrf', 'gbtrs'), (ab,))
+            lu, piv, info = gbtrf(ab, b, b)
+            if info > 0:
+                raise np.linalg.LinAlgError('Singular matrix')
+            return lambda F: gbtrs(lu, b, b, F, piv)[0]
+
+    def addDiagonal(self, K, idx, values):
+        np.add.at(K[K.shape[0] // 2], idx, values)
+        return K
+
+    def matvec(self, K, x):
+        b = K.shape[0] // 2
+        n = K.shape[1]
+        y = np.zeros_like(x, dtype=float)
+        for d in range(-b, b + 1):
+            j = np.arange(max(0, -d), min(n, n - d))
+            y[j + d] += K[b + d, j].reshape((-1,) + (1,) * (x.ndim - 1)) * x[j]
+        return y
+
+    def combine(self, a, K, b, M):
+        # Bandwidths differ e.g. for a lumped M after congruence, pad the narrower one
+        bK, bM = K.shape[0] // 2, M.shape[0] // 2
+        c = max(bK, bM)
+        out = np.zeros((2 * c + 1, K.shape[1]))
+        out[c - bK:c + bK + 1] += a * K
+        out[c - bM:c + bM + 1] += b * M
+        return out
+
+    def congruence(self, K, T):
+        return self._fromSparse(T.T @ self._toSparse(K) @ T)
+
+    @staticmethod
+    def _toSparse(K):
+        # Row b + d of the band holds diagonal -d, dia_matrix stores data[k, j] = K[j - offsets[k], j]
+        b = K.shape[0] // 2
+        return sp.dia_matrix((K, b - np.arange(2 * b + 1)), shape=(K.shape[1], K.shape[1])).tocsr()
+
+    @staticmethod
+    def _fromSparse(K):
+        K = sp.coo_matrix(K)
+        b = int(np.max(np.abs(K.row - K.col), initial=0))
+        ab = np.zeros((2 * b + 1, K.shape[1]))
+        np.add.at(ab, (b + K.row - K.col, K.col), K.data)
+        return ab
+
+    def toDense(self, K):
+        b = K.shape[0] // 2
+        n = K.shape[1]
+        dense = np.zeros((n, n), dtype=K.dtype)
+        for d in range(-b, b + 1):
+            j = np.arange(max(0, -d), min(n, n - d))
+            dense[j + d, j] = K[b + d, j]
+        return dense
+
+class SparseStorage(Storage):
+    name = 'sparse'
+
+    def __init__(self) -> None:
+        if sp is None:
+            raise ImportError('Sparse storage requires scipy.')
+
+    def assemble(self, nNode, conn, KLocal):
+        rows, cols = self._scatterIndices(conn)
+        return sp.csr_matrix((KLocal.ravel(), (rows, cols)), shape=(nNode, nNode))
+
+    def principal(self, K, idx):
+        return K[idx][:, idx]
+
+    def block(self, K, rows, cols):
+        return K[rows][:, cols]
+
+    def factor(self, K):
+        lu = spla.splu(K.tocsc())
+        # SuperLU only accepts right-hand sides of the factor's precision
+        return lambda F: lu.solve(np.asarray(F, dtype=K.dtype))
+
+    def addDiagonal(self, K, idx, values):
+        return (K + sp.csr_matrix((values, (idx, idx)), shape=K.shape)).tocsr()
+
+    def matvec(self, K, x):
+        return K @ x
+
+    def congruence(self, K, T):
+        return (T.T @ K @ T).tocsr()
+
+    def toDense(self, K):
+        return K.toarray()
+
+STORAGES = {
+    DenseStorage.name: DenseStorage,
+    BandedStorage.name: BandedStorage,
+    SparseStorage.name: SparseStorage,
+}
+
+def getStorage(storage: str = 'dense') -> Storage:
+    """Creates the storage backend with the given name.
+
+    Args:
+        storage (str, optional): One of 'dense', 'banded' or 'sparse'. Defaults to 'dense'.
+
+    Raises:
+        ValueError: If the storage name is unknown.
+
+    Returns:
+        Storage: Storage backend instance.
+    """
+    if storage not in STORAGES:
+        raise ValueError(f'Unknown storage {storage!r}, expected one of {list(STORAGES)}.')
+    return STORAGES[storage]()
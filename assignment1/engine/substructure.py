@@ -0,0 +1,188 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from .instrument import instrumented, stage
+from .storage import getStorage, sla
+
+# Arrays of the running solve, inherited by forked workers or sent once
+# through the pool initializer
+_shared = {}
+
+def _initWorker(KLocal, conn, F, D, role, springK, memoryName, nNode):
+    memory = shared_memory.SharedMemory(name=memoryName)
+    _shared.update(KLocal=KLocal, conn=conn, F=F, D=D, role=role, springK=springK,
+                   memory=memory, out=np.ndarray((3, nNode), buffer=memory.buf))
+
+def _toDense(K):
+    return K.toarray() if hasattr(K, 'toarray') else np.asarray(K)
+
+def _condense(bounds):
+    """Condenses the interior DOFs of the elements in [start, stop).
+
+    The interior solution K_II^-1 rhs_I and the influence of the left and
+    right interface nodes, K_II^-1 K_IB, are written to the shared output
+    rows 0, 1 and 2 at the global interior nodes.
+
+    Returns:
+        tuple: (B, S, g), the global interface nodes of the subdomain, its
+            Schur complement contribution and its interface load contribution.
+    """
+    start, stop = bounds
+    conn = _shared['conn'][start:stop]
+    first, last = conn[0, 0], conn[-1, -1]
+    nodes = np.arange(first, last + 1)
+    storage = getStorage('banded' if sla is not None else 'dense')
+    K = storage.assemble(nodes.size, conn - first, _shared['KLocal'][start:stop])
+    role = _shared['role'][nodes]
+    I = np.flatnonzero(role == 0)
+    B = np.flatnonzero(role == 1)
+    known = np.flatnonzero(role == 2)
+
+    D_known = _shared['D'][nodes[known], None]
+    K_BB = _toDense(storage.block(K, B, B))
+    K_Bk = _toDense(storage.block(K, B, known))
+    g = -(K_Bk @ D_known)[:, 0]
+    if I.size == 0:
+        return nodes[B], K_BB, g
+
+    K_II = storage.principal(K, I)
+    springK = _shared['springK'][nodes[I]]
+    if np.any(springK):
+        K_II = storage.addDiagonal(K_II, np.arange(I.size), springK)
+    K_IB = _toDense(storage.block(K, I, B))
+    K_Ik = _toDense(storage.block(K, I, known))
+    rhs = _shared['F'][nodes[I], None] - K_Ik @ D_known
+    solve = storage.factor(K_II)
+    Y = solve(rhs)
+    Z = solve(K_IB) if B.size else np.zeros((I.size, 0))
+
+    out = _shared['out']
+    out[0, nodes[I]] = Y[:, 0]
+    for j, b in enumerate(B):
+        # Column 1 holds the left interface node, column 2 the right one
+        out[1 if b == 0 else 2, nodes[I]] = Z[:, j]
+    return nodes[B], K_BB - K_IB.T @ Z, g - K_IB.T @ Y[:, 0]
+
+@instrumented('solveSubstructured')
+def solveSubstructured(model, nDomain: int = None, processes: int = None):
+    """Solves a truss by Schur complement substructuring. The elements are
+       split into nDomain contiguous subdomains, which share one interface
+       node each. The interior DOFs of every subdomain are condensed in
+       parallel worker processes. The interface system is then solved and
+       the interior displacements are recovered from the condensed
+       influence vectors.
+
+       Uses the element matrices, loads, prescribed nodes and springs of
+       the model. KGlobal is never assembled.
+
+    Args:
+        model (Truss): Model after formFGlobal and a boundary condition method.
+        nDomain (int, optional): Number of subdomains. Defaults to processes.
+        processes (int, optional): Worker processes, 1 condenses in-process.
+            Defaults to os.cpu_count().
+
+    Returns:
+        np.ndarray: (nNode, 1) nodal displacements, also kept as the model
+            solution with the reactions in model.reactions.
+    """
+    system = model.system
+    if system.idx_k is None:
+        raise ValueError('Boundary conditions are undefined.')
+    if system.FGlobal is None:
+        raise ValueError('FGlobal is undefined.')
+    if system.T is not None:
+        raise ValueError('Substructuring does not support multi-point constraints.')
+    processes = processes or os.cpu_count() or 1
+    nDomain = min(nDomain or processes, model.nElem)
+    nNode = model.nNode
+
+    KLocal = np.ascontiguousarray(model.getLocalKBatch())
+    conn = model.conn
+    F = system.FGlobal[:, 0]
+    D = np.zeros(nNode)
+    D[system.idx_k] = system.D_k[:, 0]
+    springK = system._springDiagonal()
+
+    starts = np.linspace(0, model.nElem, nDomain + 1).astype(int)
+    bounds = list(zip(starts[:-1], starts[1:]))
+    # 0 interior, 1 interface, 2 prescribed
+    role = np.zeros(nNode, dtype=np.int8)
+    role[conn[starts[1:-1], 0]] = 1
+    role[system.idx_k] = 2
+    interface = np.flatnonzero(role == 1)
+
+    memory = shared_memory.SharedMemory(create=True, size=3 * nNode * 8)
+    out = np.ndarray((3, nNode), buffer=memory.buf)
+    try:
+        out[:] = 0.0
+        args = (KLocal, conn, F, D, role, springK, memory.name, nNode)
+        with stage('condense', nNode):
+            if processes == 1 or nDomain == 1:
+                _initWorker(*args)
+                results = [_condense(b) for b in bounds]
+            else:
+                with multiprocessing.Pool(min(processes, nDomain), _initWorker, args) as pool:
+                    results = pool.map(_condense, bounds)
+
+        with stage('interface', interface.size):
+            position = np.full(nNode, -1)
+            position[interface] = np.arange(interface.size)
+            S = np.diag(springK[interface])
+            g = F[interface].copy()
+            for B, S_s, g_s in results:
+                p = position[B]
+                S[np.ix_(p, p)] += S_s
+                g[p] += g_s
+            D[interface] = np.linalg.solve(S, g) if interface.size else D[interface]
+
+        with stage('recover', nNode):
+            # Interface displacement on either side of every node, 0 where none
+            domain = np.searchsorted(starts[1:-1], np.arange(model.nElem), side='right')
+            nodeDomain = np.empty(nNode, dtype=int)
+            nodeDomain[conn] = domain[:, None]
+            nodeDomain[interface] = -1
+            left = np.append(0.0, D[conn[starts[1:-1], 0]])
+            right = np.append(D[conn[starts[1:-1], 0]], 0.0)
+            interior = np.flatnonzero(role == 0)
+            d = nodeDomain[interior]
+            D[interior] = out[0, interior] - out[1, interior] * left[d] - out[2, interior] * right[d]
+    finally:
+        # Views of the buffer must go before the segment is closed
+        attached = _shared.pop('memory', None)
+        _shared.clear()
+        del out
+        if attached is not None:
+            attached.close()
+        memory.close()
+        memory.unlink()
+
+    solution = D.reshape((nNode, 1))
+    Ku = np.bincount(conn.ravel(), weights=np.einsum('eij,ej->ei', KLocal, D[conn]).ravel(), minlength=nNode)
+    model.reactions = (Ku + springK * D - F)[system.idx_k, None]
+    model.solution = solution
+    return solution
+
+
+if __name__ == '__main__':
+    from .truss import TrussQuadratic
+    parser = argparse.ArgumentParser(description='Times substructured against monolithic truss solves.')
+    parser.add_argument('--nElem', type=int, default=1_000_000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--storage', default='banded', help='Storage of the monolithic solve.')
+    args = parser.parse_args()
+
+    model = TrussQuadratic(50e3, 1000, 75e3, args.nElem, args.storage)
+    start = time.perf_counter()
+    model.formKGlobal()
+    model.formFGlobal(200, 350, 0, 100e3)
+    model.formDirichletNeumann()
+    reference = model.solve()
+    print(f'monolithic       {time.perf_counter() - start:9.3f} s')
+    for p in args.processes:
+        start = time.perf_counter()
+        D = solveSubstructured(model, processes=p)
+        error = np.abs(D - reference).max() / np.abs(reference).max()
+        print(f'processes {p:>3}    {time.perf_counter() - start:9.3f} s   rel. error {error:.1e}')
@@ -0,0 +1,128 @@
+import inspect
+import itertools
+import multiprocessing
+import os
+import numpy as np
+from .cache import solveCached
+
+LOAD_PARAMS = ('qStart', 'qEnd', 'fStart', 'fEnd')
+OUTPUTS = (('uEnd', np.float64), ('uMax', np.float64), ('sigmaMax', np.float64))
+
+def solveCase(cls, params: dict, n: int = 20, cache = None):
+    """Builds and solves one model with u(0) = 0, du/dx(L) = 0.
+
+    Args:
+        cls (type): Truss class, e.g. TrussLinear or TaperedTrussQuadratic.
+        params (dict): Constructor arguments of cls plus qStart, qEnd, fStart, fEnd.
+        n (int, optional): Number of field points per element. Defaults to 20.
+        cache (ResultCache, optional): Reuse stored results, see engine.cache.
+            Defaults to None, always solving.
+
+    Returns:
+        tuple: (uEnd, uMax, sigmaMax) of the solved model.
+    """
+    loads = [params.get(name, 0.0) for name in LOAD_PARAMS]
+    init = {k: v for k, v in params.items() if k not in LOAD_PARAMS}
+    if cache is not None:
+        result = solveCached(cls, init, loads, None, n, cache)
+        solution, strain = result['solution'], result['strain']
+    else:
+        model = cls(**init)
+        model.formKGlobal()
+        model.formFGlobal(*loads)
+        model.formDirichletNeumann()
+        solution = model.solve()
+        strain = model.getStrainField(n)
+    return (solution[-1, 0], np.abs(solution).max(), params['E'] * np.abs(strain).max())
+
+def _solveIndexed(job):
+    idx, cls, params, n, cache = job
+    return idx, solveCase(cls, params, n, cache)
+
+def makeGrid(grid: dict):
+    """Expands a parameter grid into the list of its combinations.
+
+    Args:
+        grid (dict): Parameter name to sequence of values.
+
+    Returns:
+        list: One dict per combination, in row-major order of the grid.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+def resultDtype(cls, grid: dict, fixed: dict = None):
+    fixed = fixed or {}
+    names = [name for name in inspect.signature(cls.__init__).parameters if name != 'self']
+    names += [name for name in LOAD_PARAMS if name not in names]
+    fields = []
+    for name in names:
+        if name in grid:
+            values = np.asarray(grid[name])
+        elif name in fixed:
+            values = np.asarray(fixed[name])
+        else:
+            continue
+        fields.append((name, values.dtype if values.dtype.kind in 'iuf' else np.dtype(object)))
+    return np.dtype(fields + list(OUTPUTS))
+
+def iterSweep(cls, grid: dict, fixed: dict = None, processes: int = None, chunksize: int = None, n: int = 20,
+              cache = None):
+    """Solves every combination of the grid across a process pool and
+       streams the results back as they complete.
+
+    Args:
+        cls (type): Truss class to build.
+        grid (dict): Parameter name to sequence of values.
+        fixed (dict, optional): Parameters shared by every case. Defaults to None.
+        processes (int, optional): Pool size, 1 runs in-process. Defaults to os.cpu_count().
+        chunksize (int, optional): Cases sent to a worker at once. Defaults to
+            about four chunks per worker.
+        n (int, optional): Number of field points per element. Defaults to 20.
+        cache (ResultCache, optional): Result cache shared by the workers. Defaults to None.
+
+    Yields:
+        tuple: (idx, params, (uEnd, uMax, sigmaMax)) in completion order.
+    """
+    fixed = fixed or {}
+    cases = [{**fixed, **params} for params in makeGrid(grid)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(cases) <= 1:
+        for idx, params in enumerate(cases):
+            yield idx, params, solveCase(cls, params, n, cache)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(cases) // (4 * processes))
+    jobs = ((idx, cls, params, n, cache) for idx, params in enumerate(cases))
+    with multiprocessing.Pool(processes) as pool:
+        for idx, result in pool.imap_unordered(_solveIndexed, jobs, chunksize):
+            yield idx, cases[idx], result
+
+def runSweep(cls, grid: dict, fixed: dict = None, processes: int = None, chunksize: int = None, n: int = 20, callback = None,
+             cache = None):
+    """Runs iterSweep and collects the results into a structured array.
+
+    Args:
+        cls (type): Truss class to build.
+        grid (dict): Parameter name to sequence of values.
+        fixed (dict, optional): Parameters shared by every case. Defaults to None.
+        processes (int, optional): Pool size, 1 runs in-process. Defaults to os.cpu_count().
+        chunksize (int, optional): Cases sent to a worker at once.
+        n (int, optional): Number of field points per element. Defaults to 20.
+        callback (callable, optional): Called with (idx, params, result) as each case completes.
+        cache (ResultCache, optional): Result cache shared by the workers. Defaults to None.
+
+    Returns:
+        np.ndarray: Structured array with one row per combination, holding
+            its parameters followed by uEnd, uMax and sigmaMax.
+    """
+    dtype = resultDtype(cls, grid, fixed)
+    cases = makeGrid(grid)
+    results = np.zeros(len(cases), dtype=dtype)
+    inputs = [name for name in dtype.names if name not in dict(OUTPUTS)]
+    for idx, params, result in iterSweep(cls, grid, fixed, processes, chunksize, n, cache):
+        results[idx] = tuple(params[name] for name in inputs) + tuple(result)
+        if callback is not None:
+            callback(idx, params, result)
+    return results
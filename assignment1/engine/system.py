@@ -1,56 +1,524 @@
 import numpy as np
+from .instrument import instrumented
+from .storage import getStorage, sla, sp, spla
+
+PRECISIONS = ('double', 'mixed')
 
 class System:
-    def __init__(self, nNode: int) -> None:
+    def __init__(self, nNode: int, storage: str = 'dense', precision: str = 'double') -> None:
+        if precision not in PRECISIONS:
+            raise ValueError(f'Unknown precision {precision!r}, expected one of {list(PRECISIONS)}.')
         self.nNode = nNode
+        self.storage = getStorage(storage)
+        # 'mixed' stores and factors K in float32 and refines the solution
+        # against float64 element matrices, see _solveMixed
+        self.precision = precision
+        self.elements = None
+        self.refineMaxIter = 30
+        self.refineStall = 5
+        self.refineFallback = False
+        self.iterations = None
+        self.residuals = None
         self.nDOF = None
         self.nKnowns = None
         self.KGlobal = None
+        self.MGlobal = None
         self.FGlobal = None
         self.K_kk =   None
         self.K_uk =   None
         self.K_uu =   None
         self.F_u  =   None
+        self.F_k  =   None
         self.D_k  =   None
         self.node_u = None
         self.node_k = None
+        self.idx_u  = None
+        self.idx_k  = None
+        # Grounded springs, (nodes, stiffness) arrays
+        self.springs = (np.empty(0, dtype=np.int32), np.empty(0))
+        self.springK_k = None
+        # Normalized (knownNodes, springs, mpcs) of the last formConstraints
+        self.constraints = None
+        # Multi-point constraints eliminated as D_u = T @ D_r + g
+        self.T    =   None
+        self.g    =   None
+        self.K_rr =   None
+        self.reactions = None
+        self.pattern = None
+        self.factorization = None
+
+    @property
+    def KGlobal(self):
+        return self._KGlobal
+
+    @KGlobal.setter
+    def KGlobal(self, KGlobal):
+        # A new stiffness matrix invalidates the partition and its factorization
+        self._KGlobal = KGlobal
+        self.K_uu = None
+        self.factorization = None
+
+    @property
+    def FGlobal(self):
+        return self._FGlobal
+
+    @FGlobal.setter
+    def FGlobal(self, FGlobal):
+        self._FGlobal = FGlobal
+        if FGlobal is not None and self.idx_u is not None:
+            self.F_u = FGlobal[self.idx_u]
+            self.F_k = FGlobal[self.idx_k]
+
+    @instrumented('solve')
+    def solve(self, F: np.ndarray = None):
+        """Solves the partitioned system. K_uu is factorized on the first
+           call and the factorization is reused until KGlobal or the
+           boundary conditions change. The reaction forces at the known
+           nodes, K_ku D_u + K_kk D_k - F_k, are kept in self.reactions.
+
+        Args:
+            F (np.ndarray, optional): (nNode, nCases) global load matrix, one
+                load case per column. Defaults to FGlobal.
+
+        Returns:
+            np.ndarray: (nNode, nCases) nodal displacements.
+        """
+        if self.K_uu is None:
+            self._formMatrices()
+        if self.factorization is None:
+            self._factor()
+        if F is None:
+            if self.F_u is None:
+                raise ValueError('FGlobal is undefined.')
+            F_u, F_k = self.F_u, self.F_k
+        else:
+            F = np.asarray(F).reshape((self.nNode, -1))
+            F_u, F_k = F[self.idx_u], F[self.idx_k]
+        if self.precision == 'mixed':
+            return self._solveMixed(self.FGlobal if F is None else F)
+        rhs = F_u - self.K_uk @ self.D_k
+        if self.T is None:
+            D_u = self.factorization(rhs)
+        else:
+            rhs = rhs - self.storage.matvec(self.K_uu, self.g)[:, None]
+            D_u = self.T @ self.factorization(self.T.T @ rhs) + self.g[:, None]
+        D = np.empty((self.nNode, D_u.shape[1]))
+        D[self.idx_u] = D_u
+        D[self.idx_k] = self.D_k
+        self.reactions = (self.K_uk.T @ D_u + self.K_kk @ self.D_k
+                          + self.springK_k[:, None] * self.D_k - F_k)
+        return D
+
+    @instrumented('modes', 'nDOF')
+    def solveModes(self, k: int = 6, sigma: float = 0.0):
+        """Solves K phi = omega^2 M phi for the k eigenpairs nearest to sigma
+           on the unknown DOFs, by shift-invert Lanczos on the factorization
+           of K_uu - sigma M_uu in the storage format of KGlobal. Prescribed
+           nodes are held fixed and multi-point constraints are eliminated.
+           Without scipy, or when k is close to nDOF, the dense generalized
+           problem is solved instead.
+
+        Args:
+            k (int, optional): Number of modes. Defaults to 6.
+            sigma (float, optional): Shift in omega^2, 0 returns the lowest modes.
+                Use a small negative value for unsupported bodies. Defaults to 0.0.
+
+        Returns:
+            tuple: (omega, modes), the (k,) increasing angular frequencies and
+                the (nNode, k) mass normalized mode shapes.
+        """
+        if self.MGlobal is None:
+            raise ValueError('MGlobal is undefined.')
+        if self.K_uu is None:
+            self._formMatrices()
+        K = self.K_uu
+        M = self.storage.principal(self.MGlobal, self.idx_u)
+        if self.T is not None:
+            K = self.K_rr
+            M = self.storage.congruence(M, self.T)
+        n = K.shape[1]
+        if not 0 < k <= n:
+            raise ValueError(f'k must lie in [1, {n}].')
+
+        if spla is None or k >= n - 1:
+            K, M = self.storage.toDense(K), self.storage.toDense(M)
+            if sla is not None:
+                w, V = sla.eigh(K, M, subset_by_index=[0, k - 1])
+            else:
+                LInv = np.linalg.inv(np.linalg.cholesky(M))
+                w, V = np.linalg.eigh(LInv @ K @ LInv.T)
+                w, V = w[:k], LInv.T @ V[:, :k]
+        else:
+            storage = self.storage
+            shifted = storage.factor(storage.combine(1.0, K, -sigma, M))
+            operator = lambda A: spla.LinearOperator((n, n), matvec=lambda x: storage.matvec(A, x), dtype=float)
+            OPinv = spla.LinearOperator((n, n), matvec=lambda x: shifted(x.reshape((-1, 1)))[:, 0], dtype=float)
+            w, V = spla.eigsh(operator(K), k, operator(M), sigma=sigma, OPinv=OPinv)
+            order = np.argsort(w)
+            w, V = w[order], V[:, order]
+
+        modes = np.zeros((self.nNode, k))
+        modes[self.idx_u] = V if self.T is None else self.T @ V
+        return np.sqrt(np.maximum(w, 0.0)), modes
+
+    def _applyK(self, D: np.ndarray):
+        """Returns K @ D in float64 for (nNode, nCases) D, from the element
+           matrices when they were given and from KGlobal otherwise.
+        """
+        if self.elements is None:
+            KD = self.storage.matvec(self.KGlobal, D).astype(float)
+        else:
+            KLocal, conn = self.elements
+            KD = np.einsum('eij,ejc->eic', KLocal, D[conn])
+            KD = np.stack([np.bincount(conn.ravel(), weights=KD[:, :, c].ravel(), minlength=self.nNode)
+                           for c in range(D.shape[1])], axis=1)
+        return KD + self._springDiagonal()[:, None] * D
+
+    def _solveMixed(self, F: np.ndarray):
+        """Refines the solution of the float32 factorization to float64
+           accuracy. Plain iterative refinement contracts by about
+           cond(K) * eps32 per step, which exceeds one on fine meshes, so the
+           refinement runs as conjugate gradients preconditioned by the
+           float32 factorization, on residuals computed in float64.
+
+           Like LAPACK dsposv, the iteration stops once the residual is at
+           the level of a float64 backward stable solve,
+           |r| < |x| |K| eps sqrt(nDOF) in the max norm. When cond(K) * eps32
+           is far above one the float32 factorization is no preconditioner at
+           all and the residual never drops, so the solve falls back to a
+           float64 factorization once the residual has not improved for
+           refineStall steps, or after refineMaxIter steps. The relative
+           residual history is kept in self.residuals.
+        """
+        F = np.asarray(F, dtype=float).reshape((self.nNode, -1))
+        idx_u, T = self.idx_u, self.T
+        reduce = (lambda v: v) if T is None else (lambda v: T.T @ v)
+        expand = (lambda v: v) if T is None else (lambda v: T @ v)
+        dtype = (self.K_uu if T is None else self.K_rr).dtype
+        precondition = lambda r: np.asarray(self.factorization(r.astype(dtype)), dtype=float)
+        tol = self._normK() * np.finfo(float).eps * np.sqrt(self.nDOF)
+
+        D = np.zeros(F.shape)
+        D[self.idx_k] = self.D_k
+        if T is not None:
+            D[idx_u] = self.g[:, None]
+        r = reduce((F - self._applyK(D))[idx_u])
+        bNorm = np.linalg.norm(r, axis=0)
+        bNorm[bNorm == 0] = 1.0
+        z = precondition(r)
+        p = z.copy()
+        rz = np.sum(r * z, axis=0)
+        self.residuals = [np.max(np.linalg.norm(r, axis=0) / bNorm)]
+        self.iterations = 0
+        best, bestIteration = self.residuals[0], 0
+        P = np.zeros(F.shape)
+        while np.any(np.abs(r).max(axis=0) >= tol * np.abs(D).max(axis=0)):
+            if (self.iterations == self.refineMaxIter or self.iterations - bestIteration >= self.refineStall
+                    or not np.isfinite(self.residuals[-1])):
+                return self._fallback(F)
+            P[idx_u] = expand(p)
+            Ap = reduce(self._applyK(P)[idx_u])
+            pAp = np.sum(p * Ap, axis=0)
+            alpha = np.divide(rz, pAp, out=np.zeros_like(rz), where=pAp != 0)
+            D[idx_u] += expand(alpha * p)
+            r -= alpha * Ap
+            z = precondition(r)
+            rzNew = np.sum(r * z, axis=0)
+            p = z + np.divide(rzNew, rz, out=np.zeros_like(rz), where=rz != 0) * p
+            rz = rzNew
+            self.iterations += 1
+            self.residuals.append(np.max(np.linalg.norm(r, axis=0) / bNorm))
+            if self.residuals[-1] < best:
+                best, bestIteration = self.residuals[-1], self.iterations
+        self.reactions = (self._applyK(D) - F)[self.idx_k]
+        return D
+
+    def _normK(self):
+        # Max row sum of |K|, from the float64 element matrices when available
+        if self.elements is None:
+            return np.max(self.storage.matvec(abs(self.KGlobal), np.ones(self.nNode)))
+        KLocal, conn = self.elements
+        return np.max(np.bincount(conn.ravel(), weights=np.abs(KLocal).sum(axis=2).ravel(),
+                                  minlength=self.nNode) + self._springDiagonal())
+
+    def _fallback(self, F: np.ndarray):
+        """Switches to float64 storage and a direct solve when the float32
+           factorization is too inaccurate for refinement to converge.
+        """
+        KGlobal, elements = self.KGlobal, self.elements
+        # Release the float32 blocks and factorization before building the float64 ones
+        self.KGlobal = None
+        self.K_rr = None
+        self.elements = None
+        if elements is None:
+            KGlobal = KGlobal.astype(float)
+        else:
+            KLocal, conn = elements
+            del KGlobal
+            KGlobal = self.storage.assemble(self.nNode, conn, np.asarray(KLocal, dtype=float))
+        self.precision = 'double'
+        self.refineFallback = True
+        self.KGlobal = KGlobal
+        return self.solve(F)
+
+    @instrumented('factorization', 'nDOF')
+    def _factor(self):
+        self.factorization = self.storage.factor(self.K_uu if self.T is None else self.K_rr)
+
+    @instrumented('solveCG', 'nDOF')
+    def solveCG(self, KLocal: np.ndarray, conn: np.ndarray, tol: float = 1e-10,
+                maxIter: int = None, preconditioner: str = 'jacobi'):
+        """Solves the partitioned system with preconditioned conjugate
+           gradients without forming KGlobal. K @ u is applied element by
+           element and the known DOFs are eliminated through idx_u/idx_k.
+
+        Args:
+            KLocal (np.ndarray): (nElem, n, n) stack of element matrices.
+            conn (np.ndarray): (nElem, n) connectivity array.
+            tol (float, optional): Relative residual tolerance. Defaults to 1e-10.
+            maxIter (int, optional): Iteration limit. Defaults to 10 * nDOF.
+            preconditioner (str, optional): 'jacobi', 'block' for element
+                blocks, or None. Defaults to 'jacobi'.
+
+        Returns:
+            np.ndarray: (nNode, 1) nodal displacements. The iteration count and
+                the relative residual history are kept in self.iterations and
+                self.residuals.
+        """
+        if self.idx_u is None:
+            raise ValueError('Boundary conditions are undefined.')
+        if self.FGlobal is None:
+            raise ValueError('FGlobal is undefined.')
+        if self.T is not None:
+            raise ValueError('solveCG does not support multi-point constraints.')
+        maxIter = 10 * self.nDOF if maxIter is None else maxIter
+        idx_u = self.idx_u
+        springK = self._springDiagonal()
+
+        def applyK(u):
+            Ku = np.einsum('eij,ej->ei', KLocal, u[conn])
+            return np.bincount(conn.ravel(), weights=Ku.ravel(), minlength=self.nNode) + springK * u
+
+        u = np.zeros(self.nNode)
+        u[self.idx_k] = self.D_k[:, 0]
+        b = self.FGlobal[idx_u, 0] - applyK(u)[idx_u]
+        applyM = self._formPreconditioner(KLocal, conn, preconditioner)
+
+        x = np.zeros(self.nDOF)
+        r = b.copy()
+        z = applyM(r)
+        p = z.copy()
+        rz = r @ z
+        bNorm = np.linalg.norm(b) or 1.0
+        self.residuals = [np.linalg.norm(r) / bNorm]
+        self.iterations = 0
+        while self.residuals[-1] > tol and self.iterations < maxIter:
+            u[:] = 0.0
+            u[idx_u] = p
+            Ap = applyK(u)[idx_u]
+            alpha = rz / (p @ Ap)
+            x += alpha * p
+            r -= alpha * Ap
+            z = applyM(r)
+            rzNew = r @ z
+            p = z + rzNew / rz * p
+            rz = rzNew
+            self.iterations += 1
+            self.residuals.append(np.linalg.norm(r) / bNorm)
 
-    def solve(self):
-        D_u = np.linalg.solve(self.K_uu, self.F_u - self.K_uk @ self.D_k )
-        if self.nKnowns == 1:
-            return np.vstack((self.D_k[0], D_u))
-        if self.nKnowns == 2:
-            return np.vstack((self.D_k[0], D_u, self.D_k[-1]))
-        return 
+        D = np.empty((self.nNode, 1))
+        D[idx_u, 0] = x
+        D[self.idx_k] = self.D_k
+        self.reactions = (applyK(D[:, 0]) - self.FGlobal[:, 0])[self.idx_k, None]
+        return D
+
+    def _formPreconditioner(self, KLocal, conn, preconditioner):
+        if preconditioner is None:
+            return lambda r: r
+        known = np.zeros(self.nNode, dtype=bool)
+        known[self.idx_k] = True
+        springK = self._springDiagonal()
+        if preconditioner == 'jacobi':
+            diag = (np.bincount(conn.ravel(), weights=np.diagonal(KLocal, axis1=1, axis2=2).ravel(),
+                                minlength=self.nNode) + springK)[self.idx_u]
+            return lambda r: r / diag
+        if preconditioner == 'block':
+            # Element e owns every node but its last, the last element owns all of
+            # its nodes. The owned blocks of the assembled K are inverted once.
+            n = conn.shape[1]
+            own = np.full((len(conn), n), -1)
+            own[:, :-1] = conn[:, :-1]
+            own[-1, -1] = conn[-1, -1]
+            blocks = KLocal.copy()
+            blocks[1:, 0, 0] += KLocal[:-1, -1, -1]
+            blocks[:-1, -1, :] = 0.0
+            blocks[:-1, :, -1] = 0.0
+            blocks[:-1, -1, -1] = 1.0
+            e, i = np.nonzero(own >= 0)
+            blocks[e, i, i] += springK[own[e, i]]
+            # Known DOFs become identity rows so the blocks stay invertible
+            ownKnown = (own >= 0) & known[own]
+            blocks[np.broadcast_to(ownKnown[:, :, None], blocks.shape)] = 0.0
+            blocks[np.broadcast_to(ownKnown[:, None, :], blocks.shape)] = 0.0
+            e, i = np.nonzero(ownKnown)
+            blocks[e, i, i] = 1.0
+            blocksInv = np.linalg.inv(blocks)
+            own = np.where(own >= 0, own, self.nNode)
+
+            def applyM(r):
+                rFull = np.zeros(self.nNode + 1)
+                rFull[self.idx_u] = r
+                z = np.einsum('eij,ej->ei', blocksInv, rFull[own])
+                zFull = np.zeros(self.nNode + 1)
+                zFull[own] = z
+                return zFull[self.idx_u]
+            return applyM
+        raise ValueError(f'Unknown preconditioner {preconditioner!r}.')
 
     def form(self, D_k: np.ndarray, u0Known = True, uLKnown = False):
-        self.nKnowns = int(u0Known) + int(uLKnown)
+        """Prescribes the end nodes, kept for the two classic bar supports."""
+        knownNodes = np.flatnonzero([u0Known, uLKnown]) * (self.nNode - 1)
+        self.formConstraints(knownNodes, D_k)
+
+    @instrumented('boundary')
+    def formConstraints(self, knownNodes, D_k: np.ndarray, springs = None, mpcs = None):
+        """Applies prescribed displacements, grounded spring supports and
+           multi-point constraints. When only D_k or the MPC offsets change
+           the partition and its factorization are kept.
+
+        Args:
+            knownNodes (array_like): Global indices of the prescribed nodes.
+            D_k (np.ndarray): (nKnowns, 1) prescribed displacements ordered as knownNodes.
+            springs (tuple, optional): (nodes, k) arrays, a spring of stiffness
+                k[i] from nodes[i] to the ground. Defaults to None.
+            mpcs (list, optional): (slave, masters, coefficients, offset) tuples,
+                each imposing u[slave] = coefficients @ u[masters] + offset.
+                Masters must be unknown nodes that are not slaves. Defaults to None.
+
+        Raises:
+            ValueError: If a node is out of range, prescribed twice or
+                constrained inconsistently.
+        """
+        knownNodes = np.asarray(knownNodes, dtype=np.int32).reshape(-1)
+        D_k = np.asarray(D_k, dtype=float)
+        D_k = D_k.reshape((-1, 1)) if D_k.ndim < 2 else D_k
+        if D_k.shape[0] != knownNodes.size:
+            raise ValueError(f'D_k has {D_k.shape[0]} rows, expected {knownNodes.size}.')
+        springNodes, springK = (np.empty(0), np.empty(0)) if springs is None else springs
+        springNodes = np.asarray(springNodes, dtype=np.int32).reshape(-1)
+        springK = np.broadcast_to(np.asarray(springK, dtype=float), springNodes.shape)
+        normalized = []
+        for slave, masters, coeffs, offset in mpcs or []:
+            masters = np.atleast_1d(masters).astype(int)
+            coeffs = np.broadcast_to(np.asarray(coeffs, dtype=float), masters.shape)
+            normalized.append((int(slave), tuple(masters), tuple(coeffs), float(offset)))
+        mpcs = normalized
+        self.constraints = (knownNodes, (springNodes, np.array(springK)), mpcs)
+        for nodes in (knownNodes, springNodes):
+            if nodes.size and (nodes.min() < 0 or nodes.max() >= self.nNode):
+                raise ValueError(f'Constrained nodes must lie in [0, {self.nNode}).')
+        if np.unique(knownNodes).size != knownNodes.size:
+            raise ValueError('A node is prescribed more than once.')
+
+        pattern = (knownNodes.tobytes(), springNodes.tobytes(), springK.tobytes(),
+                   tuple(mpc[:3] for mpc in mpcs))
+        offsets = np.array([mpc[3] for mpc in mpcs])
+        if pattern == self.pattern and self.K_uu is not None:
+            # Only the prescribed values changed, K_uu and its factorization still hold
+            self.D_k = D_k
+            if self.g is not None:
+                self.g[self.node_u[[mpc[0] for mpc in mpcs]]] = offsets
+            return
+        self.pattern = pattern
+        self.nKnowns = knownNodes.size
         self.nDOF = self.nNode - self.nKnowns
         self.D_k = D_k
-        self.K_kk = np.zeros((self.nKnowns, self.nKnowns))
-        self.K_uk = np.zeros((self.nDOF, self.nKnowns))
-        self.K_uu = np.zeros((self.nDOF, self.nDOF))
-        self.F_u  = np.zeros((self.nDOF, 1))
-        self._formMappings(u0Known, uLKnown)
-        self._formMatrices()
+        self.springs = (springNodes, np.array(springK))
+        self._formMappings(knownNodes)
+        self.springK_k = self._springDiagonal()[self.idx_k]
+        self._formTransform(mpcs, offsets)
+        # The matrix-free path forms the boundary conditions without a KGlobal
+        self.K_uu = None
+        self.factorization = None
+        if self.KGlobal is not None:
+            self._formMatrices()
 
-    def _formMappings(self, u0Known = True, uLKnown = False):
-        # Mapping from Global to Unknowns
-        self.node_u = np.arange(self.nNode, dtype=np.int32)
+    def _formMappings(self, knownNodes: np.ndarray):
+        # Global node indices ordered by their known/unknown index
+        self.idx_k = knownNodes
         self.node_k = np.full((self.nNode,), -1, dtype=np.int32)
-        # Mark knowns in the unknowns list
-        if u0Known:
-            self.node_k[0] = 0
-            self.node_u -= 1
-        if uLKnown:
-            self.node_k[-1] = 1
-            self.node_u[-1] = -1
+        self.node_k[knownNodes] = np.arange(self.nKnowns, dtype=np.int32)
+        mask_u = self.node_k == -1
+        self.idx_u = np.flatnonzero(mask_u).astype(np.int32)
+        self.node_u = np.full((self.nNode,), -1, dtype=np.int32)
+        self.node_u[mask_u] = np.arange(self.nDOF, dtype=np.int32)
+
+    def _formTransform(self, mpcs: list, offsets: np.ndarray):
+        """Builds D_u = T @ D_r + g, where D_r are the unknowns left after
+           eliminating the slaves of the multi-point constraints.
+        """
+        if not mpcs:
+            self.T = None
+            self.g = None
+            return
+        if sp is None:
+            raise ImportError('Multi-point constraints require scipy.')
+        slaves = np.array([mpc[0] for mpc in mpcs])
+        masters = np.concatenate([mpc[1] for mpc in mpcs]).astype(int)
+        coeffs = np.concatenate([mpc[2] for mpc in mpcs])
+        owner = np.repeat(np.arange(len(mpcs)), [len(mpc[1]) for mpc in mpcs])
+        if np.unique(slaves).size != slaves.size:
+            raise ValueError('A node is the slave of more than one constraint.')
+        if (np.any((masters < 0) | (masters >= self.nNode)) or np.any(self.node_u[slaves] < 0)
+                or np.any(self.node_u[masters] < 0) or np.isin(masters, slaves).any()):
+            raise ValueError('Constraint slaves and masters must be distinct unknown nodes.')
+
+        slavePos = self.node_u[slaves]
+        keep = np.ones(self.nDOF, dtype=bool)
+        keep[slavePos] = False
+        col = np.full(self.nDOF, -1)
+        col[keep] = np.arange(keep.sum())
+        rows = np.concatenate((np.flatnonzero(keep), slavePos[owner]))
+        cols = np.concatenate((col[keep], col[self.node_u[masters]]))
+        data = np.concatenate((np.ones(keep.sum()), coeffs))
+        self.T = sp.csr_matrix((data, (rows, cols)), shape=(self.nDOF, int(keep.sum())))
+        self.g = np.zeros(self.nDOF)
+        self.g[slavePos] = offsets
 
+    def _springDiagonal(self):
+        nodes, k = self.springs
+        # bincount returns integers when there are no springs
+        return np.bincount(nodes, weights=k, minlength=self.nNode).astype(float, copy=False)
+
+    @instrumented('partition')
     def _formMatrices(self):
+        if self.node_u is None:
+            raise ValueError('Boundary conditions are undefined.')
         if self.KGlobal is None:
             raise ValueError('KGlobal is undefined.')
-        if self.FGlobal is None:
-            raise ValueError('FGlobal is undefined.')
+        idx_u = self.idx_u
+        idx_k = self.idx_k
+
+        self.K_uu = self.storage.principal(self.KGlobal, idx_u)
+        springK_u = self._springDiagonal()[idx_u]
+        if np.any(springK_u):
+            self.K_uu = self.storage.addDiagonal(self.K_uu, np.arange(self.nDOF), springK_u)
+        self.K_kk = self.storage.block(self.KGlobal, idx_k, idx_k)
+        self.K_uk = self.storage.block(self.KGlobal, idx_k, idx_u).T
+        self.K_rr = None if self.T is None else self.storage.congruence(self.K_uu, self.T)
+        # Modal analysis partitions K without any loads
+        self.F_u  = None if self.FGlobal is None else self.FGlobal[idx_u]
+        self.F_k  = None if self.FGlobal is None else self.FGlobal[idx_k]
+        self.factorization = None
+
+    def _formMatricesLoop(self):
+        """Reference element-by-element partitioning, kept for benchmarking
+           against the vectorized _formMatrices. Dense storage only.
+        """
+        self.K_kk = np.zeros((self.nKnowns, self.nKnowns))
+        self.K_uk = np.zeros((self.nDOF, self.nKnowns))
+        self.K_uu = np.zeros((self.nDOF, self.nDOF))
+        self.F_u  = np.zeros((self.nDOF, 1))
         for i in range(self.nNode):
             for j in range(self.nNode):
                 if self.node_u[i] != -1:
@@ -2,21 +2,37 @@ import numpy as np
 from .truss import TrussLinear, TrussQuadratic
 
 class TaperedTrussLinear(TrussLinear):
+    STIFFNESS_INPUTS = TrussLinear.STIFFNESS_INPUTS + ('h1', 'dh')
 
-    def __init__(self, E: float, L: float, A0: float, h1: float, h2: float, nElem: int) -> None:
-        super().__init__(E, L, A0, nElem)
+    def __init__(self, E: float, L: float, A0: float, h1: float, h2: float, nElem: int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
+        super().__init__(E, L, A0, nElem, storage, x_node, precision)
         self.h1 = h1
         self.dh = h2 - h1
 
+    def getArea(self, x):
+        return self.A * (1 + self.dh / self.L / self.h1 * np.asarray(x))
+
     def getLocalK(self, e: int):
         x1, x2 = self.x_node[self.conn[e]]
         c = (1 + self.dh / self.L / self.h1 * (x1 + x2) / 2)
+        if not self.uniform:
+            c *= self.lElem / self.lElems[e]
         return self.localK * c
+
+    def getLocalKBatch(self):
+        x = self.x_node[self.conn]
+        c = (1 + self.dh / self.L / self.h1 * (x[:, 0] + x[:, 1]) / 2)
+        if not self.uniform:
+            c *= self.lElem / self.lElems
+        return self.localK * c[:, None, None]
     
 class TaperedTrussQuadratic(TrussQuadratic):
+    STIFFNESS_INPUTS = TrussQuadratic.STIFFNESS_INPUTS + ('h1', 'dh', 'localKx1', 'localKx2', 'localKx3')
 
-    def __init__(self, E: float, L: float, A0: float, h1: float, h2: float, nElem: int) -> None:
-        super().__init__(E, L, A0, nElem)
+    def __init__(self, E: float, L: float, A0: float, h1: float, h2: float, nElem: int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
+        super().__init__(E, L, A0, nElem, storage, x_node, precision)
         self.localK = self.localK
         self.k = self.k / 10
         self.h1 = h1
@@ -34,8 +50,21 @@ class TaperedTrussQuadratic(TrussQuadratic):
              [ -4,  48, -44],
              [  7, -44,  37]])
 
+    def getArea(self, x):
+        return self.A * (1 + self.dh / self.L / self.h1 * np.asarray(x))
 
     def getLocalK(self, e: int):
         x1, x2, x3 = self.x_node[self.conn[e]]
         c = self.dh / self.h1 / self.L
-        return self.localK + c * (x1 * self.localKx1 + x2 * self.localKx2 + x3 * self.localKx3)
\ No newline at end of file
+        K = self.localK + c * (x1 * self.localKx1 + x2 * self.localKx2 + x3 * self.localKx3)
+        if not self.uniform:
+            K = K * (self.lElem / self.lElems[e])
+        return K
+
+    def getLocalKBatch(self):
+        x1, x2, x3 = self.x_node[self.conn].T[:, :, None, None]
+        c = self.dh / self.h1 / self.L
+        K = self.localK + c * (x1 * self.localKx1 + x2 * self.localKx2 + x3 * self.localKx3)
+        if not self.uniform:
+            K = K * (self.lElem / self.lElems)[:, None, None]
+        return K
\ No newline at end of file
@@ -1,9 +1,14 @@
+from functools import lru_cache
 import numpy as np
 from .fem1d import FEM1D
+from .instrument import instrumented
+from .quadrature import gaussLegendre
 
 class Truss(FEM1D):
+    STIFFNESS_INPUTS = FEM1D.STIFFNESS_INPUTS + ('localK', 'localKUnit')
 
-    def __init__(self, E:float, L: float, A: float, nElem: int, nLocalNode: int) -> None:
+    def __init__(self, E:float, L: float, A: float, nElem: int, nLocalNode: int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
         """_summary_
 
         Args:
@@ -11,8 +16,11 @@ class Truss(FEM1D):
             L (float): _description_
             A (float): _description_
             nElem (int): _description_
+            storage (str, optional): Global stiffness storage. Defaults to 'dense'.
+            x_node (np.ndarray, optional): Node coordinates of a non-uniform mesh.
+            precision (str, optional): 'double' or 'mixed'. Defaults to 'double'.
         """        
-        super().__init__(L, nElem, nLocalNode)
+        super().__init__(L, nElem, nLocalNode, storage, x_node, precision)
         self.E = E
         self.A = A
 
@@ -26,90 +34,279 @@ class Truss(FEM1D):
             NotImplementedError: Base Class does not implement the Stiffness Matrix.
         """        
         raise NotImplementedError
+
+    def getLocalKBatch(self):
+        """Computes the Stiffness matrices of all elements at once.
+           Subclasses override this with a vectorized expression, the
+           default falls back to getLocalK element by element.
+
+        Returns:
+            np.ndarray: (nElem, nLocalNode, nLocalNode) stack of element matrices.
+        """
+        return np.array([self.getLocalK(e) for e in range(self.nElem)])
+
+    def getArea(self, x: np.ndarray):
+        """Cross-section area at the coordinates x.
+
+        Args:
+            x (np.ndarray): Coordinates along the truss.
+
+        Returns:
+            np.ndarray: Areas of the same shape as x.
+        """
+        return np.full(np.shape(x), float(self.A))
+
+    @staticmethod
+    def shapeFunctions(ksi: np.ndarray):
+        """Evaluates the element shape functions.
+
+        Args:
+            ksi (np.ndarray): Natural coordinates in [-1, 1].
+
+        Raises:
+            NotImplementedError: Base Class does not define shape functions.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def shapeDerivatives(ksi: np.ndarray):
+        """Evaluates the derivatives of the shape functions w.r.t. ksi.
+
+        Args:
+            ksi (np.ndarray): Natural coordinates in [-1, 1].
+
+        Raises:
+            NotImplementedError: Base Class does not define shape functions.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def fieldTables(cls, n: int = 20):
+        """Shape function and derivative tables at n equally spaced points
+           of every element, built once per element class and n.
+
+        Args:
+            n (int, optional): Number of points per element. Defaults to 20.
+
+        Returns:
+            tuple: (N, dN) read-only arrays of shape (n, nLocalNode).
+        """
+        ksi = np.linspace(-1, 1, n)
+        N = cls.shapeFunctions(ksi)
+        dN = cls.shapeDerivatives(ksi)
+        N.flags.writeable = False
+        dN.flags.writeable = False
+        return N, dN
+
+    @instrumented('formFGlobal')
+    def formFGlobalFunction(self, q, fStart: float, fEnd: float, nGauss: int = 4):
+        """Forms the 1D F Global Matrix for an arbitrary distributed load
+           q(x), integrated with Gauss-Legendre quadrature over every element.
+
+        Args:
+            q (callable): Vectorized load function q(x) [N/mm].
+            fStart (float): Point load at x = 0.
+            fEnd (float): Point load at x = L.
+            nGauss (int, optional): Quadrature points per element. Defaults to 4.
+        """
+        return self._integrateFGlobal(q, fStart, fEnd, nGauss)
+
+    def _integrateFGlobal(self, q, fStart, fEnd, nGauss):
+        # Undecorated, so each formFGlobal entry point records a single stage
+        ksi, w = gaussLegendre(nGauss)
+        N = self.shapeFunctions(ksi)
+        xGauss = self.x_node[self.conn] @ N.T
+        qGauss = np.broadcast_to(q(xGauss), xGauss.shape)
+        FLocal = (qGauss * w) @ N * (self.lElems[:, None] / 2)
+        return self._assembleFGlobal(FLocal, fStart, fEnd)
+
+    def _formFGlobalLinearQ(self, qStart, qEnd, fStart, fEnd):
+        # (nLocalNode + 2) // 2 points integrate the linear load times N exactly
+        qDiff = (qEnd - qStart) / self.L
+        return self._integrateFGlobal(lambda x: qStart + qDiff * x, fStart, fEnd,
+                                      nGauss = (self.nLocalNode + 2) // 2)
+
+    def _assembleFGlobal(self, FLocal: np.ndarray, fStart: float, fEnd: float):
+        FGlobal = np.bincount(self.conn.ravel(), weights=FLocal.ravel(),
+                              minlength=self.nNode).reshape((self.nNode, 1))
+        FGlobal[-1] += fEnd
+        FGlobal[0] += fStart
+        self.system.FGlobal = FGlobal
+        return FGlobal
     
+    @instrumented('getXField')
     def getXField(self, n:int = 20):
-        raise NotImplementedError
+        N, _ = self.fieldTables(n)
+        return (self.x_node[self.conn] @ N.T).reshape((-1, 1))
     
+    @instrumented('getDispField')
     def getDispField(self, n:int = 20):
-        raise NotImplementedError
+        N, _ = self.fieldTables(n)
+        return (self.solution[self.conn, 0] @ N.T).reshape((-1, 1))
     
+    @instrumented('getStrainField')
     def getStrainField(self, n:int = 20):
-        raise NotImplementedError
+        _, dN = self.fieldTables(n)
+        # dx/dksi = lElem / 2 on every element
+        return (self.solution[self.conn, 0] @ dN.T * (2 / self.lElems[:, None])).reshape((-1, 1))
+
+    @instrumented('getFields')
+    def getFields(self, n: int = 20, elems = slice(None)):
+        """Evaluates the x, displacement and strain fields together from a
+           single gather of the nodal values.
+
+        Args:
+            n (int, optional): Number of points per element. Defaults to 20.
+            elems (optional): Element indices or slice to evaluate. Defaults to all.
+
+        Returns:
+            tuple: (x, u, strain), each of shape (n * nSelected, 1).
+        """
+        N, dN = self.fieldTables(n)
+        conn = self.conn[elems]
+        u = self.solution[conn, 0]
+        x = self.x_node[conn] @ N.T
+        return (x.reshape((-1, 1)),
+                (u @ N.T).reshape((-1, 1)),
+                (u @ dN.T * (2 / self.lElems[elems, None])).reshape((-1, 1)))
 
+    @instrumented('getModeFields')
+    def getModeFields(self, n: int = 20):
+        """Evaluates the mode shapes from solveModes and their strains
+           through the same shape function tables as getFields.
+
+        Args:
+            n (int, optional): Number of points per element. Defaults to 20.
+
+        Returns:
+            tuple: (x, u, strain), x of shape (nElem * n, 1) and u, strain of
+                shape (nElem * n, k), one column per mode.
+        """
+        N, dN = self.fieldTables(n)
+        phi = self.modes[self.conn]
+        u = np.einsum('pa,eak->epk', N, phi)
+        strain = np.einsum('pa,eak->epk', dN, phi) * (2 / self.lElems[:, None, None])
+        k = self.modes.shape[1]
+        return self.getXField(n), u.reshape((-1, k)), strain.reshape((-1, k))
+
+    def iterFields(self, n: int = 20, chunk: int = 65536):
+        """Lazily evaluates the fields chunk by chunk of elements, so large
+           models never hold the full x, u and strain arrays at once.
+
+        Args:
+            n (int, optional): Number of points per element. Defaults to 20.
+            chunk (int, optional): Number of elements per chunk. Defaults to 65536.
+
+        Yields:
+            tuple: (x, u, strain) of the next chunk, each of shape (n * chunk, 1).
+        """
+        for start in range(0, self.nElem, chunk):
+            yield self.getFields(n, slice(start, start + chunk))
+
+    def solveMatrixFree(self, tol: float = 1e-10, maxIter: int = None, preconditioner: str = 'jacobi'):
+        """Solves with preconditioned conjugate gradients straight from the
+           element matrices, KGlobal is never formed. See System.solveCG.
+
+        Args:
+            tol (float, optional): Relative residual tolerance. Defaults to 1e-10.
+            maxIter (int, optional): Iteration limit. Defaults to 10 * nDOF.
+            preconditioner (str, optional): 'jacobi', 'block' or None. Defaults to 'jacobi'.
+
+        Returns:
+            np.ndarray: (nNode, 1) nodal displacements.
+        """
+        self.solution = self.system.solveCG(self.getLocalKBatch(), self.conn, tol, maxIter, preconditioner)
+        return self.solution
+
+    @instrumented('formKGlobal')
     def formKGlobal(self):
-        KGlobal = np.zeros((self.nNode, self.nNode))
-        for i in range(self.nElem):
-            K = self.getLocalK(i)
-            KShape = K.shape
-            idx = self.conn[i,0]
-            KGlobal[idx:idx+KShape[0], idx:idx+KShape[1]] += K
+        # Unchanged stiffness keeps KGlobal, the partition and its factorization
+        if not self.stiffnessDirty and self.system.KGlobal is not None:
+            return self.system.KGlobal
+        KLocal = self.getLocalKBatch()
+        if self.system.precision == 'mixed':
+            # float64 element matrices only feed the refinement residuals
+            self.system.elements = (KLocal, self.conn)
+            KLocal = KLocal.astype(np.float32)
+        KGlobal = self.system.storage.assemble(self.nNode, self.conn, KLocal)
         self.system.KGlobal = KGlobal
+        self.stiffnessDirty = False
         return KGlobal
 
+    @instrumented('formMGlobal')
+    def formMGlobal(self, rho: float, lumped: bool = False):
+        """Forms the 1D mass matrix, rho * A(x) N N^T integrated over every
+           element, in the storage format of KGlobal.
+
+        Args:
+            rho (float): Density.
+            lumped (bool, optional): Diagonal mass matrix by HRZ lumping, the
+                consistent diagonal scaled to conserve the element mass.
+                Defaults to False.
+
+        Returns:
+            Global mass matrix.
+        """
+        # nLocalNode points integrate N N^T A(x) exactly for a linear A(x)
+        ksi, w = gaussLegendre(self.nLocalNode)
+        N = self.shapeFunctions(ksi)
+        xGauss = self.x_node[self.conn] @ N.T
+        weights = rho * self.getArea(xGauss) * w * (self.lElems[:, None] / 2)
+        MLocal = np.einsum('eg,ga,gb->eab', weights, N, N)
+        if lumped:
+            diag = np.diagonal(MLocal, axis1=1, axis2=2)
+            diag = diag * (weights.sum(axis=1) / diag.sum(axis=1))[:, None]
+            MLocal = diag[:, :, None] * np.eye(self.nLocalNode)
+        MGlobal = self.system.storage.assemble(self.nNode, self.conn, MLocal)
+        self.system.MGlobal = MGlobal
+        return MGlobal
+
 class TrussLinear(Truss):
 
     
-    def __init__(self, E: float, L: float, A: float, nElem: int) -> None:
-        super().__init__(E, L, A, nElem, nLocalNode = 2)
+    def __init__(self, E: float, L: float, A: float, nElem: int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
+        super().__init__(E, L, A, nElem, nLocalNode = 2, storage = storage, x_node = x_node, precision = precision)
         self.k = self.E * self.A / self.lElem
         self.localK = np.array([[self.k, -self.k], [-self.k, self.k]])
 
     def getLocalK(self, e: int):
-        return self.localK
+        if self.uniform:
+            return self.localK
+        return self.localK * (self.lElem / self.lElems[e])
+
+    def getLocalKBatch(self):
+        if self.uniform:
+            return np.broadcast_to(self.localK, (self.nElem,) + self.localK.shape)
+        return self.localK * (self.lElem / self.lElems)[:, None, None]
+
+    @staticmethod
+    def shapeFunctions(ksi: np.ndarray):
+        return np.stack(((1 - ksi) / 2, (1 + ksi) / 2), axis=-1)
+
+    @staticmethod
+    def shapeDerivatives(ksi: np.ndarray):
+        return np.stack((np.full_like(ksi, -1/2), np.full_like(ksi, 1/2)), axis=-1)
 
+    @instrumented('formFGlobal')
     def formFGlobal(self, qStart, qEnd, fStart, fEnd):
-        FGlobal = np.zeros((self.nNode,1))
+        if not self.uniform:
+            return self._formFGlobalLinearQ(qStart, qEnd, fStart, fEnd)
         qDiff = (qEnd - qStart) / self.L * self.lElem
-        q = np.linspace(qStart, qEnd, self.nNode)
+        q = np.linspace(qStart, qEnd, self.nNode)[:self.nElem]
 
-        for i, nodes in enumerate(self.conn):
-            FGlobal[nodes[0]] += self.lElem * (q[i] / 2 + qDiff / 6)
-            FGlobal[nodes[1]] += self.lElem * (q[i] / 2 + qDiff / 3)
-        FGlobal[-1] += fEnd
-        FGlobal[0] += fStart
-        
-        self.system.FGlobal = FGlobal
-
-    def getXField(self, n: int = 20):
-        N = n * self.nElem
-        x = np.zeros((N, 1))
-        ksi = np.linspace(-1, 1, n).reshape((n,1))
-        N1 = (1 - ksi) / 2
-        N2 = (1 + ksi) / 2
-        for i, (node1, node2) in enumerate(self.conn):
-            N1x1 = self.x_node[node1] * N1
-            N2x2 = self.x_node[node2] * N2
-            x[i*n:(i+1)*n] = N1x1 + N2x2
-        return x
-    
-    def getDispField(self, n: int = 20):
-        N = n * self.nElem
-        uField = np.zeros((N, 1))
-        ksi = np.linspace(-1, 1, n).reshape((n,1))
-        N1 = (1 - ksi) / 2
-        N2 = (1 + ksi) / 2
-        for i, (node1, node2) in enumerate(self.conn):
-            N1x1 = self.solution[node1] * N1
-            N2x2 = self.solution[node2] * N2
-            uField[i*n:(i+1)*n] = N1x1 + N2x2
-        return uField
-    
-    def getStrainField(self, n: int = 20):
-        N = n * self.nElem
-        sField = np.zeros((N, 1))
-        B1 = -1/2
-        B2 = 1/2
-        for i, (node1, node2) in enumerate(self.conn):
-            B1x1 = self.solution[node1] * B1 / self.lElem
-            B2x2 = self.solution[node2] * B2 / self.lElem
-            sField[i*n:(i+1)*n] = B1x1 + B2x2
-        return sField
+        FLocal = np.stack((
+            self.lElem * (q / 2 + qDiff / 6),
+            self.lElem * (q / 2 + qDiff / 3)), axis=1)
+        return self._assembleFGlobal(FLocal, fStart, fEnd)
         
 
 class TrussQuadratic(Truss):
     
-    def __init__(self, E: float, L: float, A: float, nElem: int) -> None:
-        super().__init__(E, L, A, nElem, nLocalNode = 3)
+    def __init__(self, E: float, L: float, A: float, nElem: int, storage: str = 'dense', x_node: np.ndarray = None,
+                 precision: str = 'double') -> None:
+        super().__init__(E, L, A, nElem, nLocalNode = 3, storage = storage, x_node = x_node, precision = precision)
         self.k = self.E * self.A / self.lElem / 3
         self.localK = self.k * np.array(
             [[ 7, -8,  1],
@@ -117,62 +314,23 @@ class TrussQuadratic(Truss):
              [1,  -8,  7]])
 
     def getLocalK(self, e: int):
-        return self.localK
+        if self.uniform:
+            return self.localK
+        return self.localK * (self.lElem / self.lElems[e])
 
-    def formFGlobal(self, qStart, qEnd, fStart, fEnd):
-        FGlobal = np.zeros((self.nNode,1))
-        qDiff = (qEnd - qStart) / self.L * self.lElem
-        q = np.linspace(qStart, qEnd, self.nNode)
-        
-        for i, nodes in enumerate(self.conn):
-            f0 = q[i] * self.lElem / 2
-            x1, x2, x3 = self.x_node[nodes]
-            FGlobal[nodes[0]] += f0 / 3 + qDiff / 30 * (4 * x1 +  2 * x2      -x3)
-            FGlobal[nodes[1]] += 4 * f0 / 3 + qDiff / 30 * (2 * x1 + 16 * x2 + 2 * x3)
-            FGlobal[nodes[2]] += f0 / 3 + qDiff / 30 * (   -x1 +  2 * x2 + 4 * x3)
-        FGlobal[-1] += fEnd
-        FGlobal[0] += fStart
-        
-        self.system.FGlobal = FGlobal
+    def getLocalKBatch(self):
+        if self.uniform:
+            return np.broadcast_to(self.localK, (self.nElem,) + self.localK.shape)
+        return self.localK * (self.lElem / self.lElems)[:, None, None]
 
-    def getXField(self, n: int = 20):
-        N = n * self.nElem
-        x = np.zeros((N, 1))
-        ksi = np.linspace(-1, 1, n).reshape((n,1))
-        N1 = ksi * (ksi - 1) / 2
-        N2 = 1 - ksi*ksi
-        N3 = ksi * (ksi + 1) / 2
-        for i, (node1, node2, node3) in enumerate(self.conn):
-            N1x1 = self.x_node[node1] * N1
-            N2x2 = self.x_node[node2] * N2
-            N3x3 = self.x_node[node3] * N3
-            x[i*n:(i+1)*n] = N1x1 + N2x2 + N3x3
-        return x
-
-    def getDispField(self, n: int = 20):
-        N = n * self.nElem
-        uField = np.zeros((N, 1))
-        ksi = np.linspace(-1, 1, n).reshape((n,1))
-        N1 = ksi * (ksi - 1) / 2
-        N2 = 1 - ksi*ksi
-        N3 = ksi * (ksi + 1) / 2
-        for i, (node1, node2, node3) in enumerate(self.conn):
-            N1u1 = self.solution[node1] * N1
-            N2u2 = self.solution[node2] * N2
-            N3u3 = self.solution[node3] * N3
-            uField[i*n:(i+1)*n] = N1u1 + N2u2 + N3u3
-        return uField
-    
-    def getStrainField(self, n: int = 20):
-        N = n * self.nElem
-        eField = np.zeros((N, 1))
-        ksi = np.linspace(-1, 1, n).reshape((n,1))
-        B1 = ksi - 1/2
-        B2 = - 2*ksi
-        B3 = ksi + 1/2
-        for i, (node1, node2, node3) in enumerate(self.conn):
-            B1e1 = self.solution[node1] * B1 / self.lElem
-            B2e2 = self.solution[node2] * B2 / self.lElem
-            B3e3 = self.solution[node3] * B3 / self.lElem
-            eField[i*n:(i+1)*n] = B1e1 + B2e2 + B3e3
-        return eField
\ No newline at end of file
+    @staticmethod
+    def shapeFunctions(ksi: np.ndarray):
+        return np.stack((ksi * (ksi - 1) / 2, 1 - ksi*ksi, ksi * (ksi + 1) / 2), axis=-1)
+
+    @staticmethod
+    def shapeDerivatives(ksi: np.ndarray):
+        return np.stack((ksi - 1/2, - 2*ksi, ksi + 1/2), axis=-1)
+
+    @instrumented('formFGlobal')
+    def formFGlobal(self, qStart, qEnd, fStart, fEnd):
+        return self._formFGlobalLinearQ(qStart, qEnd, fStart, fEnd)